@@ -0,0 +1,766 @@
+#! /usr/bin/env python3
+# Benchmarks for the launcher's hot paths. Everything runs against a fake
+# Mojang on localhost - served as a mirror (the layout mirror.py exports), so
+# no request ever leaves the machine and the numbers only move when our code
+# does.
+#
+#   python bench.py                                   # everything
+#   python bench.py install_cold install_warm -r 10   # just these, 10 rounds each
+#   python bench.py --json today.json --compare before.json
+#   python bench.py --trace bench-trace.json          # Chrome trace of every round
+#   python bench.py --check-resume                    # interrupted downloads still end up byte-identical
+#   python bench.py --check-install                   # inheriting profiles & co. install completely
+#
+# --compare exits with 1 if any median got more than --threshold slower.
+import argparse
+import hashlib
+import http.client
+import importlib.util
+import io
+import json
+import logging
+import os
+import platform
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import zipfile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import tracing
+from config_store import ConfigStore
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+VERSION_ID = "bench-1"
+ASSET_INDEX_ID = "bench"
+# Nothing may ever be fetched from here - the mirror has it all. If something
+# does fall through, it fails fast instead of quietly timing the internet
+UPSTREAM = "http://127.0.0.1:9"
+DEFAULT_ROUNDS = 5
+DEFAULT_THRESHOLD = 1.25
+
+
+class SkipBenchmark(Exception):
+    pass
+
+
+# --- fake Mojang ---
+
+def build_mirror(assets=4000, libraries=60, manifest_versions=5000):
+    # {path: bytes} for one installable version with a realistic shape (lots of
+    # small assets, a few dozen libraries, one native, a big client jar) and a
+    # manifest as long as Mojang's, padded with versions nobody installs
+    files = {}
+
+    def add(path, data):
+        files["/" + path] = data
+        return {"url": f"{UPSTREAM}/{path}", "sha1": hashlib.sha1(data).hexdigest(), "size": len(data)}
+
+    objects = {}
+    for i in range(assets):
+        data = (f"asset {i} " * (40 + i % 400)).encode()
+        sha1 = hashlib.sha1(data).hexdigest()
+        files[f"/assets/objects/{sha1[:2]}/{sha1}"] = data
+        objects[f"minecraft/sounds/bench/{i}.ogg"] = {"hash": sha1, "size": len(data)}
+    asset_index = add(f"assets/indexes/{ASSET_INDEX_ID}.json", json.dumps({"objects": objects}).encode())
+    asset_index["id"] = ASSET_INDEX_ID
+    asset_index["totalSize"] = sum(len(files[f"/assets/objects/{o['hash'][:2]}/{o['hash']}"]) for o in objects.values())
+
+    libs = []
+    for i in range(libraries):
+        path = f"org/bench/lib{i}/1.0/lib{i}-1.0.jar"
+        artifact = add(f"libraries/{path}", (f"library {i} " * 4000).encode())
+        artifact["path"] = path
+        libs.append({"name": f"org.bench:lib{i}:1.0", "downloads": {"artifact": artifact}})
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as zf:
+        zf.writestr("libbench.so", b"\0" * 200000)
+        zf.writestr("META-INF/MANIFEST.MF", b"Manifest-Version: 1.0\n")
+    native = add("libraries/org/bench/natives/1.0/natives-1.0-natives-linux.jar", buf.getvalue())
+    native["path"] = "org/bench/natives/1.0/natives-1.0-natives-linux.jar"
+    libs.append({"name": "org.bench:natives:1.0", "downloads": {"classifiers": {"natives-linux": native}},
+                 "natives": {"linux": "natives-linux"}, "extract": {"exclude": ["META-INF/"]}})
+    log_config = add("assets/log_configs/client-bench.xml", b"<Configuration></Configuration>")
+    log_config["id"] = "client-bench.xml"
+
+    client = add(f"versions/{VERSION_ID}/{VERSION_ID}.jar", os.urandom(4 * 1024 * 1024))
+    version = add(f"versions/{VERSION_ID}/{VERSION_ID}.json", json.dumps({
+        "id": VERSION_ID,
+        "type": "release",
+        "mainClass": "net.minecraft.client.main.Main",
+        "assets": ASSET_INDEX_ID,
+        "assetIndex": asset_index,
+        "downloads": {"client": client},
+        "libraries": libs,
+        "logging": {"client": {"argument": "-Dlog4j.configurationFile=${path}", "file": log_config,
+                               "type": "log4j2-xml"}},
+        "arguments": {
+            "game": ["--username", "${auth_player_name}", "--version", "${version_name}",
+                     "--gameDir", "${game_directory}", "--assetsDir", "${assets_root}",
+                     "--assetIndex", "${assets_index_name}", "--uuid", "${auth_uuid}",
+                     "--accessToken", "${auth_access_token}", "--userType", "${user_type}"],
+            "jvm": ["-Djava.library.path=${natives_directory}", "-cp", "${classpath}"]
+        },
+        "releaseTime": "2024-01-01T00:00:00+00:00",
+        "time": "2024-01-01T00:00:00+00:00"
+    }).encode())
+
+    entries = [{"id": VERSION_ID, "type": "release", "url": version["url"], "sha1": version["sha1"],
+                "releaseTime": "2024-01-01T00:00:00+00:00", "time": "2024-01-01T00:00:00+00:00"}]
+    for i in range(manifest_versions - 1):
+        version_type = ("snapshot", "release", "old_beta", "old_alpha")[i % 4]
+        entries.append({"id": f"{i // 100}.{i % 100}-{version_type}", "type": version_type,
+                        "url": f"{UPSTREAM}/versions/filler-{i}.json", "sha1": "0" * 40,
+                        "releaseTime": f"20{23 - i // 400:02d}-01-01T00:00:00+00:00", "time": "2024"})
+    files["/version_manifest_v2.json"] = json.dumps({"latest": {"release": VERSION_ID}, "versions": entries}).encode()
+    return files
+
+
+class Faults:
+    # What the fake Mojang does wrong, for the resume checks and install_flaky.
+    # Ranges are honoured like a real CDN unless told otherwise.
+    def __init__(self):
+        self.range = "honor"  # "honor", "ignore" (always a full 200) or "refuse" (416)
+        self.drops = {}  # path -> [bytes to send before hanging up, times left (None: always)]
+        self.requests = []  # (path, Range header, status) for everything we served
+
+    def drop(self, path, after, times=None):
+        self.drops[path] = [after, times]
+
+    def reset(self):
+        self.__init__()
+
+    def take_drop(self, path):
+        drop = self.drops.get(path)
+        if not drop or drop[1] == 0:
+            return None
+        if drop[1] is not None:
+            drop[1] -= 1
+        return drop[0]
+
+
+def serve_mirror(files, faults):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # Keep-alive, like Mojang's CDN
+        disable_nagle_algorithm = True
+
+        def log_message(self, *args):
+            pass
+
+        def _empty(self, status, etag=None):
+            self.send_response(status)
+            if etag:
+                self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def do_GET(self):
+            data = files.get(self.path)
+            if data is None:
+                self._empty(404)
+                return
+            etag = '"%s"' % hashlib.sha1(data).hexdigest()
+            if self.headers.get("If-None-Match") == etag:
+                self._empty(304, etag)
+                return
+            byte_range = self.headers.get("Range")
+            start = 0
+            status = 200
+            if byte_range and faults.range != "ignore" and self.headers.get("If-Range", etag) == etag:
+                start = int(byte_range[len("bytes="):].rstrip("-"))
+                if faults.range == "refuse" or start >= len(data):
+                    faults.requests.append((self.path, byte_range, 416))
+                    self._empty(416)
+                    return
+                status = 206
+            faults.requests.append((self.path, byte_range, status))
+            body = data[start:]
+            self.send_response(status)
+            self.send_header("ETag", etag)
+            if status == 206:
+                self.send_header("Content-Range", f"bytes {start}-{len(data) - 1}/{len(data)}")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            limit = faults.take_drop(self.path)
+            if limit is not None and limit < len(body):
+                # Hang up mid-body, like a flaky link would
+                self.wfile.write(body[:limit])
+                self.wfile.flush()
+                self.close_connection = True
+                self.connection.shutdown(socket.SHUT_RDWR)
+                return
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="bench-mirror", daemon=True).start()
+    return server
+
+
+# --- benchmarks ---
+# Each one is (setup, run): setup builds a fresh scratch dir outside the timing,
+# run is the timed part. Both get the Bench, which holds the mirror and scratch space.
+
+class Bench:
+    def __init__(self, args):
+        self.args = args
+        self.root = tempfile.mkdtemp(prefix="hackerman-bench-")
+        self.files = build_mirror(args.assets, args.libraries, args.manifest_versions)
+        import downloader
+        # The retry backoff is there for real links - here it would only time sleep()
+        downloader.RETRY_DELAY = 0.01
+        self.faults = Faults()
+        self.server = serve_mirror(self.files, self.faults)
+        self.mirror = f"http://127.0.0.1:{self.server.server_port}/"
+        self.config = {"mirror": self.mirror}
+        self._installed = None
+
+    def close(self):
+        self.server.shutdown()
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def scratch(self):
+        return tempfile.mkdtemp(dir=self.root)
+
+    def installed_dir(self):
+        # One installed data dir that the warm benchmarks share
+        if self._installed is None:
+            import pipeline
+            self._installed = self.scratch()
+            pipeline.install_version(VERSION_ID, self._installed, config=self.config, data_dir=self._installed)
+        return self._installed
+
+    def python(self, code_or_args, env=None):
+        argv = [sys.executable] + (["-c", code_or_args] if isinstance(code_or_args, str) else code_or_args)
+        subprocess.run(argv, cwd=HERE, env=env, check=True, stdout=subprocess.DEVNULL)
+
+
+def setup_none(bench):
+    return None
+
+
+def run_import_cold(bench, state):
+    # A fresh interpreter importing everything a launch needs (no GTK)
+    bench.python("import pipeline, downloader, storage, mirror")
+
+
+def setup_import_gui(bench):
+    if importlib.util.find_spec("gi") is None:
+        raise SkipBenchmark("PyGObject is not installed")
+
+
+def run_import_gui(bench, state):
+    bench.python("import launcher")
+
+
+def setup_cli_startup(bench):
+    # XDG dir with a config pointing at the mirror and a cached manifest, so this
+    # is the everyday "cli.py list-versions" - interpreter, config, cache, output
+    xdg = bench.scratch()
+    data_dir = os.path.join(xdg, "hackerman-launcher")
+    os.makedirs(data_dir)
+    with open(os.path.join(data_dir, "config.json"), "w") as f:
+        json.dump(bench.config, f)
+    env = dict(os.environ, XDG_CONFIG_HOME=xdg)
+    env.pop(tracing.TRACE_ENV, None)
+    bench.python(["cli.py", "list-versions"], env)
+    return env
+
+
+def run_cli_startup(bench, state):
+    bench.python(["cli.py", "list-versions", "--type", "all"], state)
+
+
+def _config_with_accounts(path, count):
+    config = ConfigStore(path, delay=0)
+    config.load()
+    for i in range(count):
+        config.add_account(f"Player{i:05d}")
+    config["selected_account"] = "Player00000"
+    return config
+
+
+def setup_config_load(bench):
+    path = os.path.join(bench.scratch(), "config.json")
+    _config_with_accounts(path, bench.args.accounts).flush()
+    return path
+
+
+def run_config_load(bench, path):
+    ConfigStore(path).load()
+
+
+def setup_config_save(bench):
+    return _config_with_accounts(os.path.join(bench.scratch(), "config.json"), bench.args.accounts)
+
+
+def run_config_save(bench, config):
+    config["selected_version_id"] = str(time.time())  # Something to save
+    config.flush()
+
+
+def _load_versions(data_dir, url):
+    # What the window does: the cached list right away, then a refresh
+    from manifest_cache import ManifestCache, with_local_versions
+    from version_index import VersionIndex
+
+    cache = ManifestCache(data_dir, url)
+    with tracing.span("load_versions"):
+        versions = cache.cached_versions()
+        if versions is None or not cache.is_fresh():
+            versions, changed = cache.refresh(force=versions is not None)
+        index = VersionIndex(with_local_versions(versions, data_dir))
+        index.search("1.", "release")
+    return index
+
+
+def setup_load_versions_cold(bench):
+    return bench.scratch()
+
+
+def run_load_versions_cold(bench, data_dir):
+    from downloader import manifest_url_for
+    _load_versions(data_dir, manifest_url_for(bench.config))
+
+
+def setup_load_versions_revalidate(bench):
+    # Cached but stale: a conditional request that comes back 304
+    from downloader import manifest_url_for
+    from manifest_cache import ManifestCache
+
+    data_dir = bench.scratch()
+    url = manifest_url_for(bench.config)
+    ManifestCache(data_dir, url).refresh()
+    return data_dir, url
+
+
+def run_load_versions_revalidate(bench, state):
+    from manifest_cache import ManifestCache
+
+    data_dir, url = state
+    cache = ManifestCache(data_dir, url, ttl=0)
+    with tracing.span("load_versions"):
+        versions, changed = cache.refresh()
+
+
+def setup_install_cold(bench):
+    return bench.scratch()
+
+
+def run_install_cold(bench, data_dir):
+    import pipeline
+    pipeline.install_version(VERSION_ID, data_dir, config=bench.config, data_dir=data_dir)
+
+
+def setup_install_flaky(bench):
+    # The client jar's connection drops every MiB, each retry picks up with a Range
+    bench.faults.reset()
+    bench.faults.drop(JAR_PATH, 1024 * 1024)
+    return bench.scratch()
+
+
+def run_install_flaky(bench, data_dir):
+    run_install_cold(bench, data_dir)
+    bench.faults.reset()
+
+
+def setup_install_from_store(bench):
+    # A new data dir on a machine that already has every file in the object store
+    config = dict(bench.config, object_store=os.path.join(bench.installed_dir(), "store"))
+    return bench.scratch(), config
+
+
+def run_install_from_store(bench, state):
+    import pipeline
+    data_dir, config = state
+    pipeline.install_version(VERSION_ID, data_dir, config=config, data_dir=data_dir)
+
+
+def setup_install_warm(bench):
+    return bench.installed_dir()
+
+
+def run_install_warm(bench, data_dir):
+    import pipeline
+    pipeline.install_version(VERSION_ID, data_dir, config=bench.config, data_dir=data_dir)
+
+
+def run_verify(bench, state):
+    import pipeline
+    data_dir = bench.installed_dir()
+    pipeline.install_version(VERSION_ID, data_dir, config=bench.config, data_dir=data_dir, verify=True)
+
+
+def _fake_java():
+    # build_launch_command only needs to know about a Java, not run it
+    return {"path": shutil.which("java") or "/usr/bin/java", "major": 17, "version": "17.0.0", "arch": "x86_64"}
+
+
+def setup_launch_command_cold(bench):
+    if importlib.util.find_spec("minecraft_launcher_lib") is None:
+        raise SkipBenchmark("minecraft-launcher-lib is not installed")
+    from launch_plan import LaunchPlanCache
+    data_dir = bench.installed_dir()
+    LaunchPlanCache(data_dir).invalidate(VERSION_ID)
+    return data_dir
+
+
+def run_launch_command(bench, data_dir):
+    import pipeline
+    pipeline.build_launch_command(VERSION_ID, data_dir, "Player00000", data_dir=data_dir, config=bench.config,
+                                  java=_fake_java())
+
+
+def setup_launch_command_warm(bench):
+    data_dir = setup_launch_command_cold(bench)
+    run_launch_command(bench, data_dir)
+    return data_dir
+
+
+def setup_storage_scan(bench):
+    from storage import StorageIndex
+    data_dir = bench.installed_dir()
+    StorageIndex(data_dir).scan()
+    return data_dir
+
+
+def run_storage_scan(bench, data_dir):
+    from storage import StorageIndex
+    StorageIndex(data_dir).scan()
+
+
+BENCHMARKS = {
+    "import_cold": (setup_none, run_import_cold),
+    "import_gui": (setup_import_gui, run_import_gui),
+    "cli_startup": (setup_cli_startup, run_cli_startup),
+    "config_load_10k": (setup_config_load, run_config_load),
+    "config_save_10k": (setup_config_save, run_config_save),
+    "load_versions_cold": (setup_load_versions_cold, run_load_versions_cold),
+    "load_versions_revalidate": (setup_load_versions_revalidate, run_load_versions_revalidate),
+    "install_cold": (setup_install_cold, run_install_cold),
+    "install_flaky": (setup_install_flaky, run_install_flaky),
+    "install_from_store": (setup_install_from_store, run_install_from_store),
+    "install_warm": (setup_install_warm, run_install_warm),
+    "verify": (setup_none, run_verify),
+    "launch_command_cold": (setup_launch_command_cold, run_launch_command),
+    "launch_command_warm": (setup_launch_command_warm, run_launch_command),
+    "storage_scan_warm": (setup_storage_scan, run_storage_scan),
+}
+
+
+# --- resume checks ---
+# Not timings: each one breaks the client jar's download a different way and
+# checks that we still end up with the exact bytes, through the path we expect.
+# python bench.py --check-resume
+
+JAR_PATH = f"/versions/{VERSION_ID}/{VERSION_ID}.jar"
+MiB = 1024 * 1024
+
+
+def _install_jar(bench, data_dir, retries, journal=None):
+    from download_journal import DownloadJournal
+    from downloader import Downloader
+
+    downloader = Downloader.from_config(data_dir, bench.config, retries=retries,
+                                        journal=journal or DownloadJournal.for_data_dir(data_dir))
+    try:
+        downloader.install(VERSION_ID)
+    finally:
+        downloader.close()
+
+
+def _jar_statuses(bench):
+    return [(byte_range, status) for path, byte_range, status in bench.faults.requests if path == JAR_PATH]
+
+
+def _jar_intact(bench, data_dir):
+    path = os.path.join(data_dir, JAR_PATH.lstrip("/"))
+    with open(path, "rb") as f:
+        return f.read() == bench.files[JAR_PATH] and not os.path.exists(path + ".part")
+
+
+def check_resume_206(bench):
+    # Drops every MiB, every retry resumes where the last one stopped
+    bench.faults.drop(JAR_PATH, MiB)
+    data_dir = bench.scratch()
+    _install_jar(bench, data_dir, retries=4)
+    expected = [(None, 200)] + [(f"bytes={n * MiB}-", 206) for n in range(1, 4)]
+    return _jar_intact(bench, data_dir) and _jar_statuses(bench) == expected
+
+
+def check_resume_200(bench):
+    # The server ignores Range - the retry has to start over, not append
+    bench.faults.range = "ignore"
+    bench.faults.drop(JAR_PATH, MiB, times=1)
+    data_dir = bench.scratch()
+    _install_jar(bench, data_dir, retries=1)
+    return _jar_intact(bench, data_dir) and _jar_statuses(bench) == [(None, 200), (f"bytes={MiB}-", 200)]
+
+
+def check_resume_416(bench):
+    # The server refuses the range - the .part gets dropped, the next retry starts clean
+    bench.faults.range = "refuse"
+    bench.faults.drop(JAR_PATH, MiB, times=1)
+    data_dir = bench.scratch()
+    _install_jar(bench, data_dir, retries=2)
+    expected = [(None, 200), (f"bytes={MiB}-", 416), (None, 200)]
+    return _jar_intact(bench, data_dir) and _jar_statuses(bench) == expected
+
+
+def check_resume_across_runs(bench):
+    # No retries left: the install fails, and a later one (a fresh journal, as
+    # after a restart) resumes from the .part the journal vouches for
+    from download_journal import DownloadJournal
+    from downloader import DownloadError
+
+    bench.faults.drop(JAR_PATH, MiB, times=1)
+    data_dir = bench.scratch()
+    journal_path = os.path.join(data_dir, "cache", "partials.json")
+    try:
+        _install_jar(bench, data_dir, retries=0, journal=DownloadJournal(journal_path))
+        return False
+    except (DownloadError, OSError, http.client.HTTPException):
+        pass
+    _install_jar(bench, data_dir, retries=0, journal=DownloadJournal(journal_path))
+    return (_jar_intact(bench, data_dir) and _jar_statuses(bench) == [(None, 200), (f"bytes={MiB}-", 206)]
+            and not DownloadJournal(journal_path).entries())
+
+
+def check_resume_bad_part(bench):
+    # A full-length .part with the wrong bytes: no request at all, the hash
+    # check throws it away and the retry downloads it clean
+    from download_journal import DownloadJournal
+
+    data_dir = bench.scratch()
+    part_path = os.path.join(data_dir, JAR_PATH.lstrip("/")) + ".part"
+    os.makedirs(os.path.dirname(part_path))
+    with open(part_path, "wb") as f:
+        f.write(b"\0" * len(bench.files[JAR_PATH]))
+    journal = DownloadJournal.for_data_dir(data_dir)
+    journal.record(part_path, bench.mirror + JAR_PATH.lstrip("/"), hashlib.sha1(bench.files[JAR_PATH]).hexdigest())
+    _install_jar(bench, data_dir, retries=1, journal=journal)
+    return _jar_intact(bench, data_dir) and _jar_statuses(bench) == [(None, 200)]
+
+
+RESUME_CHECKS = {
+    "206 resume after drops": check_resume_206,
+    "200 when Range is ignored": check_resume_200,
+    "416 when Range is refused": check_resume_416,
+    "resume across runs": check_resume_across_runs,
+    "corrupt full-length part": check_resume_bad_part,
+}
+
+
+# --- install checks ---
+# What ends up on disk for the setups the plain benchmarks don't cover.
+# python bench.py --check-install
+
+CHILD_ID = "child-1"
+
+
+def _write_child_profile(data_dir):
+    # A modloader-style profile: no files of its own, everything from the parent
+    child_dir = os.path.join(data_dir, "versions", CHILD_ID)
+    os.makedirs(child_dir)
+    with open(os.path.join(child_dir, f"{CHILD_ID}.json"), "w") as f:
+        json.dump({"id": CHILD_ID, "inheritsFrom": VERSION_ID, "type": "release",
+                   "mainClass": "net.bench.Loader", "libraries": []}, f)
+
+
+def check_inherited_natives(bench):
+    # The game gets versions/<launched id>/natives as java.library.path, so the
+    # child needs the parent's natives in its own dir
+    import pipeline
+
+    data_dir = bench.scratch()
+    _write_child_profile(data_dir)
+    pipeline.install_version(CHILD_ID, data_dir, config=bench.config, data_dir=data_dir)
+    return all(os.path.isfile(os.path.join(data_dir, "versions", version_id, "natives", "libbench.so"))
+               for version_id in (CHILD_ID, VERSION_ID))
+
+
+def _offline_cli(bench):
+    # (data dir, env) for cli.py on a machine that can't reach anything
+    xdg = bench.scratch()
+    data_dir = os.path.join(xdg, "hackerman-launcher")
+    os.makedirs(data_dir)
+    with open(os.path.join(data_dir, "config.json"), "w") as f:
+        json.dump({"mirror": UPSTREAM}, f)
+    env = dict(os.environ, XDG_CONFIG_HOME=xdg)
+    env.pop(tracing.TRACE_ENV, None)
+    return data_dir, env
+
+
+def _listed_versions(env):
+    return subprocess.run([sys.executable, "cli.py", "list-versions", "--type", "all"], cwd=HERE, env=env,
+                          check=True, capture_output=True, text=True).stdout.split()
+
+
+def check_offline_pack_import(bench):
+    # A lab machine that can't reach anything: after importing a pack, the
+    # version list comes from the pack's manifest
+    import mirror
+
+    source = bench.installed_dir()
+    pack = os.path.join(bench.scratch(), "lab.tar")
+    mirror.export_pack([VERSION_ID], source, source, pack)
+    data_dir, env = _offline_cli(bench)
+    bench.python(["cli.py", "import-pack", pack], env)
+    return VERSION_ID in _listed_versions(env)
+
+
+def check_offline_installed_only(bench):
+    # Offline with no manifest cached at all - installed profiles still show up
+    data_dir, env = _offline_cli(bench)
+    _write_child_profile(data_dir)
+    return CHILD_ID in _listed_versions(env)
+
+
+def check_export_not_installed(bench):
+    # Only what's on disk goes into a pack, a version that isn't installed is an
+    # error - not a download
+    import mirror
+
+    source = bench.installed_dir()
+    bench.faults.reset()
+    try:
+        mirror.export_pack(["0.1-release"], source, source, os.path.join(bench.scratch(), "lab.tar"))
+    except mirror.MirrorError:
+        return not bench.faults.requests
+    return False
+
+
+INSTALL_CHECKS = {
+    "inherited natives": check_inherited_natives,
+    "offline pack import": check_offline_pack_import,
+    "offline, nothing cached": check_offline_installed_only,
+    "export of a missing version": check_export_not_installed,
+}
+
+
+def run_checks(bench, checks):
+    failed = 0
+    for name, check in checks.items():
+        bench.faults.reset()
+        try:
+            ok = check(bench)
+        except Exception as e:
+            logging.warning(f"{name}: {e}")
+            ok = False
+        print(f"{name:28}{'ok' if ok else 'FAILED'}")
+        if not ok:
+            if _jar_statuses(bench):
+                print(f"{'':28}jar requests: {_jar_statuses(bench)}")
+            failed += 1
+    bench.faults.reset()
+    return failed
+
+
+# --- running and reporting ---
+
+def run_benchmark(bench, name, rounds):
+    setup, run = BENCHMARKS[name]
+    times = []
+    for round_number in range(rounds):
+        state = setup(bench)
+        start = time.perf_counter()
+        with tracing.span(f"bench:{name}", round=round_number):
+            run(bench, state)
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def _ms(seconds):
+    return f"{seconds * 1000:9.1f}"
+
+
+def compare(results, baseline, threshold):
+    regressions = []
+    for name, result in results.items():
+        before = baseline.get("results", {}).get(name)
+        if not before or "median" not in result or "median" not in before:
+            continue
+        ratio = result["median"] / before["median"] if before["median"] else 1.0
+        flag = "  REGRESSION" if ratio > threshold else ""
+        print(f"{name:28}{_ms(before['median'])} ms ->{_ms(result['median'])} ms  {ratio:5.2f}x{flag}")
+        if flag:
+            regressions.append(name)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="bench.py", description="Time the launcher's hot paths against a local fake Mojang.")
+    parser.add_argument("benchmarks", nargs="*", help=f"Which ones (default: all of {', '.join(BENCHMARKS)})")
+    parser.add_argument("-r", "--rounds", type=int, default=DEFAULT_ROUNDS, help="Timed rounds per benchmark")
+    parser.add_argument("--assets", type=int, default=4000, help="Asset objects in the fake version")
+    parser.add_argument("--libraries", type=int, default=60, help="Libraries in the fake version")
+    parser.add_argument("--manifest-versions", type=int, default=5000, help="Entries in the fake version manifest")
+    parser.add_argument("--accounts", type=int, default=10000, help="Accounts in the config benchmarks")
+    parser.add_argument("--json", metavar="FILE", help="Write the results here")
+    parser.add_argument("--compare", metavar="FILE", help="Results of an earlier --json run to compare against")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Slowdown (median ratio) that counts as a regression")
+    parser.add_argument("--trace", metavar="FILE", help="Write a Chrome trace of every round")
+    parser.add_argument("--check-resume", action="store_true",
+                        help="Break downloads on purpose (drops, ignored and refused ranges) and check the results")
+    parser.add_argument("--check-install", action="store_true",
+                        help="Install setups the benchmarks don't cover (inheriting profiles, ...) and check the results")
+    args = parser.parse_args(argv)
+
+    unknown = [name for name in args.benchmarks if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"Unknown benchmark(s): {', '.join(unknown)}")
+    # Only our own warnings, the install logs would drown the table
+    logging.basicConfig(level=logging.WARNING, format="%(levelname)s - %(message)s")
+    if args.trace:
+        tracing.enable(args.trace)
+
+    bench = Bench(args)
+    checks = dict(RESUME_CHECKS if args.check_resume else {}, **(INSTALL_CHECKS if args.check_install else {}))
+    if checks:
+        try:
+            return 1 if run_checks(bench, checks) else 0
+        finally:
+            bench.close()
+    results = {}
+    try:
+        print(f"{'benchmark':28}{'median':>12}{'min':>12}{'max':>12}")
+        for name in args.benchmarks or BENCHMARKS:
+            try:
+                times = run_benchmark(bench, name, args.rounds)
+            except SkipBenchmark as e:
+                print(f"{name:28}   skipped: {e}")
+                results[name] = {"skipped": str(e)}
+                continue
+            results[name] = {"median": statistics.median(times), "min": min(times), "max": max(times), "runs": times}
+            print(f"{name:28}{_ms(results[name]['median'])} ms{_ms(min(times))} ms{_ms(max(times))} ms")
+    finally:
+        bench.close()
+        tracing.save()
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({
+                "created": time.time(),
+                "python": platform.python_version(),
+                "machine": f"{platform.system()} {platform.machine()}, {os.cpu_count()} cores",
+                "settings": {"rounds": args.rounds, "assets": args.assets, "libraries": args.libraries,
+                             "manifest_versions": args.manifest_versions, "accounts": args.accounts},
+                "results": results
+            }, f, indent=2)
+    if args.compare:
+        with open(args.compare, "r") as f:
+            baseline = json.load(f)
+        print()
+        if compare(results, baseline, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,327 @@
+#! /usr/bin/env python3
+# Headless entry point for scripts and kiosks. Shares config.json and the data
+# dir with the GUI but never imports GTK, and only pulls in the download /
+# launch machinery for the commands that need it.
+import argparse
+import logging
+import os
+import sys
+import threading
+import time
+
+from config_store import ConfigStore, default_data_dir, setup_logging
+import tracing
+
+PROGRESS_INTERVAL = 0.2
+
+
+class ProgressPrinter:
+    def __init__(self, stream=sys.stderr):
+        self.stream = stream
+        self.last = 0
+        self.enabled = stream.isatty()
+
+    def __call__(self, task, status, current, total):
+        now = time.monotonic()
+        if not self.enabled or now - self.last < PROGRESS_INTERVAL:
+            return
+        self.last = now
+        line = status or task.name
+        if total:
+            line += f" {current}/{total} ({current / total * 100:.0f}%)"
+            if task.metrics and task.metrics.files_total:
+                line += f", {task.metrics.describe()}"
+        self.stream.write(f"\r\033[K{line}")
+        self.stream.flush()
+
+    def finish(self):
+        if self.enabled:
+            self.stream.write("\r\033[K")
+            self.stream.flush()
+
+
+def run_task(name, func):
+    # Same TaskRunner the GUI uses, just waited on. Ctrl+C cancels cleanly.
+    from tasks import TaskRunner, CancelledError
+
+    runner = TaskRunner()
+    finished = threading.Event()
+    outcome = {}
+    printer = ProgressPrinter()
+
+    def on_done(task, result):
+        outcome["result"] = result
+        finished.set()
+
+    def on_error(task, error):
+        outcome["error"] = error
+        finished.set()
+
+    task = runner.submit(name, func, on_progress=printer, on_done=on_done, on_error=on_error)
+    try:
+        while not finished.wait(0.1):
+            pass
+    except KeyboardInterrupt:
+        task.cancel()
+        finished.wait()
+    finally:
+        printer.finish()
+        runner.shutdown()
+
+    error = outcome.get("error")
+    if isinstance(error, CancelledError):
+        raise KeyboardInterrupt()
+    if error:
+        raise error
+    return outcome.get("result")
+
+
+def load_config(data_dir):
+    config = ConfigStore(os.path.join(data_dir, "config.json"))
+    if config.load():
+        config.flush()  # Persist migrations right away, same as the GUI does
+    return config
+
+
+def cmd_list_versions(args, data_dir, config):
+    from downloader import manifest_url_for
+    from manifest_cache import ManifestCache, with_local_versions
+    from version_index import VersionIndex
+
+    cache = ManifestCache(data_dir, manifest_url_for(config))
+    with tracing.span("load_versions"):
+        versions = cache.cached_versions()
+        if versions is None or args.refresh or not cache.is_fresh():
+            try:
+                versions, changed = cache.refresh(force=args.refresh)
+            except Exception as e:
+                # Offline with nothing cached - installed versions still count
+                print(f"Could not load the version manifest, listing installed versions only: {e}",
+                      file=sys.stderr)
+                versions = []
+        index = VersionIndex(with_local_versions(versions, data_dir))
+    selected = config.get("selected_version_id")
+    for version_id in index.search(args.filter or "", None if args.type == "all" else args.type):
+        marker = "*" if version_id == selected else " "
+        print(f"{marker} {version_id}\t{index.type_of(version_id)}")
+    return 0
+
+
+def cmd_accounts(args, data_dir, config):
+    if args.action == "list":
+        selected = config.get("selected_account")
+        for username in config.usernames():
+            marker = "*" if username == selected else " "
+            print(f"{marker} {username}\t{config.account_uuid(username)}")
+        return 0
+
+    if not args.username:
+        print(f"accounts {args.action} needs a username", file=sys.stderr)
+        return 2
+    if args.action == "add":
+        if not config.add_account(args.username):
+            print(f"Account {args.username} already exists", file=sys.stderr)
+            return 1
+    elif args.action == "remove":
+        if not config.remove_account(args.username):
+            print(f"No such account: {args.username}", file=sys.stderr)
+            return 1
+        if config.get("selected_account") == args.username:
+            config["selected_account"] = None
+    elif args.action == "select":
+        if not config.has_account(args.username):
+            print(f"No such account: {args.username}", file=sys.stderr)
+            return 1
+        config["selected_account"] = args.username
+    config.flush()
+    return 0
+
+
+def cmd_java(args, data_dir, config):
+    from runtimes import RuntimeIndex
+
+    index = RuntimeIndex(data_dir, data_dir)
+    for entry in index.runtimes(rescan=args.rescan):
+        print(f"{entry['major']}\t{entry['version']}\t{entry['arch']}\t{entry['source']}\t{entry['path']}")
+    return 0
+
+
+def cmd_install(args, data_dir, config):
+    import pipeline
+
+    version_id = args.version or config.get("selected_version_id")
+    if not version_id:
+        print("No version given and none selected in the config", file=sys.stderr)
+        return 2
+    settings = config.to_dict()
+    if args.verify:
+        bad = run_task(f"Verify {version_id}",
+                       lambda task: pipeline.verify_version(version_id, data_dir, task, settings, data_dir))
+        print(f"Repaired {len(bad)} file(s)" if bad else "Everything checks out")
+    else:
+        run_task(f"Install {version_id}",
+                 lambda task: pipeline.install_version(version_id, data_dir, task, settings, data_dir))
+    return 0
+
+
+def cmd_export_pack(args, data_dir, config):
+    import mirror
+
+    version_ids = args.versions or [config.get("selected_version_id")]
+    if not version_ids[0]:
+        print("No version given and none selected in the config", file=sys.stderr)
+        return 2
+    count = run_task(f"Export {', '.join(version_ids)}",
+                     lambda task: mirror.export_pack(version_ids, data_dir, data_dir, args.output, task))
+    if args.output != "-":
+        print(f"Packed {count} file(s) into {args.output}")
+    return 0
+
+
+def cmd_import_pack(args, data_dir, config):
+    import mirror
+    import pipeline
+    from downloader import manifest_url_for
+
+    store = pipeline.object_store_for(data_dir, config.to_dict())
+    written, linked, skipped = run_task(f"Import {args.pack}",
+                                        lambda task: mirror.import_pack(args.pack, data_dir, data_dir, store, task,
+                                                                        manifest_url_for(config)))
+    print(f"Imported {written} file(s), linked {linked} from the store, {skipped} already present")
+    return 0
+
+
+def cmd_storage(args, data_dir, config):
+    import pipeline
+    from progress import format_bytes
+    from storage import StorageIndex
+
+    store = pipeline.object_store_for(data_dir, config.to_dict())
+    index = StorageIndex(data_dir, data_dir, store).scan()
+    if args.action == "usage":
+        usage = index.usage()
+        for version_id in args.versions or sorted(usage):
+            if version_id not in usage:
+                print(f"{version_id} is not installed", file=sys.stderr)
+                return 1
+            total, exclusive = usage[version_id]
+            print(f"{version_id}\t{format_bytes(total)}\t{format_bytes(exclusive)} only used by this version")
+        return 0
+    verb = "Would free" if args.dry_run else "Freed"
+    if args.action == "remove":
+        if not args.versions:
+            print("Which versions should be removed?", file=sys.stderr)
+            return 2
+        count, freed = index.remove_versions(args.versions, args.dry_run)
+    else:
+        count, freed = index.collect_garbage(args.dry_run)
+    print(f"{verb} {format_bytes(freed)} ({count} file(s))")
+    return 0
+
+
+def cmd_launch(args, data_dir, config):
+    import pipeline
+
+    version_id = args.version or config.get("selected_version_id")
+    username = args.account or config.get("selected_account")
+    instance_name = args.instance or config.get("selected_instance") or pipeline.DEFAULT_INSTANCE
+    if not version_id:
+        print("No version given and none selected in the config", file=sys.stderr)
+        return 2
+    if not username:
+        print("No account given and none selected in the config", file=sys.stderr)
+        return 2
+    if not pipeline.is_valid_instance_name(instance_name):
+        print(f"Invalid instance name: {instance_name}", file=sys.stderr)
+        return 2
+
+    settings = config.to_dict()
+    game_dir = pipeline.instance_game_dir(data_dir, data_dir, instance_name)
+    process = run_task(
+        f"Launch {version_id} as {username} ({instance_name})",
+        lambda task: pipeline.install_and_launch(task, version_id, data_dir, username, config.account_uuid(username),
+                                                 settings, data_dir, game_dir))
+    print(f"Minecraft {version_id} running with pid {process.pid}")
+    if args.wait:
+        return process.wait()
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="cli.py", description="Hackerman Launcher, without the window.")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Log progress to the console too")
+    parser.add_argument("--trace", metavar="FILE", help=f"Write a Chrome trace of where the time went "
+                                                        f"(same as setting {tracing.TRACE_ENV})")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    launch = commands.add_parser("launch", help="Install (if needed) and start a version")
+    launch.add_argument("version", nargs="?", help="Version id (default: the one selected in the config)")
+    launch.add_argument("-a", "--account", help="Offline account to play as (default: selected account)")
+    launch.add_argument("-i", "--instance", help="Instance name (default: selected instance)")
+    launch.add_argument("-w", "--wait", action="store_true", help="Wait for the game and return its exit code")
+    launch.set_defaults(func=cmd_launch)
+
+    install = commands.add_parser("install", help="Download a version without starting it")
+    install.add_argument("version", nargs="?", help="Version id (default: the one selected in the config)")
+    install.add_argument("--verify", action="store_true", help="Rehash everything and repair broken files")
+    install.set_defaults(func=cmd_install)
+
+    list_versions = commands.add_parser("list-versions", help="Show available versions, newest first")
+    list_versions.add_argument("-t", "--type", default="release",
+                               help="release, snapshot, old_beta, old_alpha or all (default: release)")
+    list_versions.add_argument("-f", "--filter", help="Only versions containing this text")
+    list_versions.add_argument("--refresh", action="store_true", help="Revalidate the cached manifest now")
+    list_versions.set_defaults(func=cmd_list_versions)
+
+    export_pack = commands.add_parser("export-pack", help="Pack installed versions for offline machines")
+    export_pack.add_argument("output", help="Pack file (.tar.gz, .tar.xz, .tar) or - for stdout")
+    export_pack.add_argument("versions", nargs="*", help="Version ids (default: the one selected in the config)")
+    export_pack.set_defaults(func=cmd_export_pack)
+
+    import_pack = commands.add_parser("import-pack", help="Install the versions from a mirror pack")
+    import_pack.add_argument("pack", help="Pack file, or - for stdin")
+    import_pack.set_defaults(func=cmd_import_pack)
+
+    storage = commands.add_parser("storage", help="Show disk usage, remove versions, clean up unused files")
+    storage.add_argument("action", choices=["usage", "remove", "gc"])
+    storage.add_argument("versions", nargs="*", help="Version ids (usage: default all, remove: required)")
+    storage.add_argument("-n", "--dry-run", action="store_true", help="Only show what would be deleted")
+    storage.set_defaults(func=cmd_storage)
+
+    java = commands.add_parser("java", help="List the Java runtimes found on this machine")
+    java.add_argument("--rescan", action="store_true", help="Look for newly installed JDKs")
+    java.set_defaults(func=cmd_java)
+
+    accounts = commands.add_parser("accounts", help="Manage offline accounts")
+    accounts.add_argument("action", choices=["list", "add", "remove", "select"])
+    accounts.add_argument("username", nargs="?")
+    accounts.set_defaults(func=cmd_accounts)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    data_dir = default_data_dir()
+    # Everything still goes to launcher.log, the console stays quiet unless asked -
+    # errors are reported on stderr by us in a single line
+    setup_logging(data_dir, logging.INFO if args.verbose else logging.CRITICAL)
+    if args.trace:
+        tracing.enable(args.trace)
+    else:
+        tracing.enable_from_env()
+    config = load_config(data_dir)
+    try:
+        return args.func(args, data_dir, config)
+    except KeyboardInterrupt:
+        print("Cancelled", file=sys.stderr)
+        return 130
+    except Exception as e:
+        logging.info(f"{args.command} failed: {e}", exc_info=True)
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        config.flush()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
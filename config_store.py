@@ -0,0 +1,201 @@
+import json
+import logging
+import os
+import threading
+import uuid
+
+SAVE_DELAY = 0.5  # Seconds of quiet before a burst of changes hits the disk
+
+
+def default_data_dir():
+    # Store everything in the proper XDG config directory (because we're not savages)
+    xdg_config_home = os.environ.get("XDG_CONFIG_HOME", os.path.join(os.path.expanduser("~"), ".config"))
+    return os.path.join(xdg_config_home, "hackerman-launcher")
+
+
+def setup_logging(data_dir, console_level=logging.INFO):
+    # Set up logging so we can actually debug things when they break
+    os.makedirs(data_dir, exist_ok=True)
+    console = logging.StreamHandler() # Also print to console for immediate feedback
+    console.setLevel(console_level)
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler(os.path.join(data_dir, "launcher.log")),
+            console
+        ]
+    )
+
+
+def offline_uuid(username):
+    return str(uuid.uuid3(uuid.NAMESPACE_OID, username))
+
+
+class ConfigStore:
+    # config.json, but with accounts kept in a username -> account map (insertion
+    # ordered, so the UI order survives) and saves that are debounced and atomic.
+    # Everything except "accounts" behaves like a plain dict.
+    def __init__(self, path, defaults=None, delay=SAVE_DELAY):
+        self.path = path
+        self.delay = delay
+        self.defaults = dict(defaults or {})
+        self.defaults.pop("accounts", None)
+        self.values = dict(self.defaults)
+        self.accounts = {}
+        self._lock = threading.RLock()
+        self._write_lock = threading.Lock()
+        self._timer = None
+        self._dirty = False
+
+    # --- dict-ish access for the plain settings ---
+
+    def get(self, key, default=None):
+        with self._lock:
+            return self.values.get(key, default)
+
+    def __getitem__(self, key):
+        with self._lock:
+            return self.values[key]
+
+    def __setitem__(self, key, value):
+        with self._lock:
+            if self.values.get(key, object()) != value:
+                self.values[key] = value
+                self._dirty = True
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self.values
+
+    def pop(self, key, default=None):
+        with self._lock:
+            if key in self.values:
+                self._dirty = True
+            return self.values.pop(key, default)
+
+    # --- accounts ---
+
+    def account(self, username):
+        with self._lock:
+            return self.accounts.get(username)
+
+    def has_account(self, username):
+        with self._lock:
+            return username in self.accounts
+
+    def usernames(self):
+        with self._lock:
+            return list(self.accounts)
+
+    def add_account(self, username, player_uuid=None):
+        with self._lock:
+            if username in self.accounts:
+                return False
+            self.accounts[username] = {"username": username, "uuid": player_uuid or offline_uuid(username)}
+            self._dirty = True
+            return True
+
+    def remove_account(self, username):
+        with self._lock:
+            if self.accounts.pop(username, None) is None:
+                return False
+            self._dirty = True
+            return True
+
+    def account_uuid(self, username):
+        with self._lock:
+            account = self.accounts.get(username)
+            return account.get("uuid") if account else None
+
+    # --- loading and saving ---
+
+    def load(self):
+        # Returns True if the file needed migrating (old string accounts, missing
+        # UUIDs). Missing or broken files just leave us with the defaults.
+        loaded = {}
+        file_was_empty = False
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, "r") as f:
+                    content = f.read().strip()
+                if content:
+                    loaded = json.loads(content)
+                else:
+                    file_was_empty = True
+                    logging.warning("Config file is empty, starting with defaults.")
+            except json.JSONDecodeError:
+                logging.error("Error: Could not decode config.json. Starting with default config.")
+
+        migration_needed = False
+        accounts = {}
+        for account in loaded.pop("accounts", None) or []:
+            # Handle old configs that stored accounts as just strings
+            if isinstance(account, str):
+                account = {"username": account}
+                migration_needed = True
+            username = account.get("username")
+            if not username or username in accounts:
+                migration_needed = True
+                continue
+            # Make sure every account has a UUID (generate one if missing)
+            if not account.get("uuid"):
+                account["uuid"] = offline_uuid(username)
+                migration_needed = True
+            accounts[username] = account
+
+        with self._lock:
+            # Fill in any missing fields with defaults (backwards compatibility)
+            self.values = dict(self.defaults)
+            self.values.update(loaded)
+            self.accounts = accounts
+            self._dirty = migration_needed and not file_was_empty
+        return self._dirty
+
+    def to_dict(self):
+        with self._lock:
+            data = dict(self.values)
+            data["accounts"] = [dict(account) for account in self.accounts.values()]
+            return data
+
+    def save_soon(self):
+        # Coalesce: every call pushes the write back, so a burst of changes costs one write
+        with self._lock:
+            self._dirty = True
+            if self._timer:
+                self._timer.cancel()
+            self._timer = threading.Timer(self.delay, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self):
+        # Writers queue up on _write_lock and snapshot inside it, so the last write
+        # to land is always the newest state - without holding up the UI thread
+        # (which only needs _lock) while we fsync
+        with self._write_lock:
+            with self._lock:
+                if self._timer:
+                    self._timer.cancel()
+                    self._timer = None
+                if not self._dirty:
+                    return False
+                data = json.dumps(self.to_dict())
+                self._dirty = False
+            self._write(data)
+        return True
+
+    def _write(self, data):
+        # Temp file + rename, so a crash mid-write leaves the old file intact
+        directory = os.path.dirname(self.path) or "."
+        os.makedirs(directory, exist_ok=True)
+        temp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(temp_path, "w") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, self.path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
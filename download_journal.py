@@ -0,0 +1,97 @@
+import fcntl
+import json
+import logging
+import os
+import threading
+import time
+
+JOURNAL_FORMAT = 1
+
+# One journal per file for the whole process - the prefetch and a launch both
+# download into the same data dir and have to see each other's partials
+_shared = {}
+_shared_lock = threading.Lock()
+
+
+class DownloadJournal:
+    # Which <file>.part files on disk are half-finished downloads we can pick up
+    # again, and what they were a download *of*: {part path: {"url", "sha1",
+    # "validator", "started"}}. The offset is just the size of the .part file.
+    # Kept in data_dir/cache/partials.json so a resume survives closing the
+    # launcher - or only in memory (path=None), which still covers retries
+    # within one install.
+    def __init__(self, path=None):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries = None
+        self._touched = set()  # Entries this process wrote or removed
+
+    @classmethod
+    def for_data_dir(cls, data_dir):
+        path = os.path.join(data_dir, "cache", "partials.json")
+        with _shared_lock:
+            journal = _shared.get(path)
+            if journal is None:
+                journal = _shared[path] = cls(path)
+            return journal
+
+    def _read(self):
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+            if data.get("format") == JOURNAL_FORMAT:
+                return data.get("partials", {})
+        except (OSError, json.JSONDecodeError):
+            pass
+        return {}
+
+    def _load(self):
+        if self._entries is None:
+            self._entries = self._read() if self.path else {}
+        return self._entries
+
+    def _save(self):
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        temp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(f"{self.path}.lock", "a") as lock:
+                fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+                # Another launcher process (the CLI next to the window, say) may
+                # have written since we loaded - keep its entries, apply ours
+                merged = self._read()
+                for part_path in self._touched:
+                    if part_path in self._entries:
+                        merged[part_path] = self._entries[part_path]
+                    else:
+                        merged.pop(part_path, None)
+                self._entries = merged
+                with open(temp_path, "w") as f:
+                    json.dump({"format": JOURNAL_FORMAT, "partials": merged}, f)
+                os.replace(temp_path, self.path)
+        except OSError as e:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            # Losing the journal only costs us a resume, not worth failing a download over
+            logging.warning(f"Could not write the download journal: {e}")
+
+    def get(self, part_path):
+        with self._lock:
+            return self._load().get(part_path)
+
+    def record(self, part_path, url, sha1, validator=None):
+        with self._lock:
+            self._load()[part_path] = {"url": url, "sha1": sha1, "validator": validator, "started": time.time()}
+            self._touched.add(part_path)
+            self._save()
+
+    def remove(self, part_path):
+        with self._lock:
+            if self._load().pop(part_path, None) is not None:
+                self._touched.add(part_path)
+                self._save()
+
+    def entries(self):
+        with self._lock:
+            return dict(self._load())
@@ -0,0 +1,705 @@
+import fcntl
+import hashlib
+import http.client
+import json
+import logging
+import os
+import pathlib
+import platform
+import shutil
+import socket
+import threading
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from email.utils import formatdate
+from urllib.parse import unquote, urljoin, urlsplit
+
+from download_journal import DownloadJournal
+from progress import TransferStats
+import tracing
+
+MANIFEST_URL = "https://piston-meta.mojang.com/mc/game/version_manifest_v2.json"
+RESOURCES_URL = "https://resources.download.minecraft.net/"
+LIBRARIES_URL = "https://libraries.minecraft.net/"
+
+DEFAULT_WORKERS = 16
+DEFAULT_PER_HOST = 8
+CHUNK_SIZE = 64 * 1024
+USER_AGENT = "hackerman-launcher"
+# Anything this big goes through a resumable <file>.part, smaller files just start over
+RESUME_MIN_SIZE = 256 * 1024
+DEFAULT_RETRIES = 4
+RETRY_DELAY = 1.0
+
+
+class DownloadError(Exception):
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status  # HTTP status, if that's what went wrong
+
+
+class TransientDownloadError(DownloadError):
+    # Worth another try: 5xx, or a resumed file that didn't add up
+    pass
+
+
+# What a flaky link looks like - worth another try. Other OSErrors (disk full,
+# read-only, permission denied) won't go away by trying again
+RETRYABLE_ERRORS = (TransientDownloadError, http.client.HTTPException, ConnectionError, TimeoutError, socket.gaierror)
+
+
+class DownloadItem:
+    __slots__ = ("url", "path", "sha1", "size", "phase")
+
+    def __init__(self, url, path, sha1=None, size=None, phase="libraries"):
+        self.url = url
+        self.path = path
+        self.sha1 = sha1
+        self.size = size
+        self.phase = phase
+
+
+def sha1_of_file(path):
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class LocalResponse:
+    # Just enough of http.client.HTTPResponse for file:// mirrors
+    def __init__(self, status, headers=None):
+        self.status = status
+        self.headers = headers or {}
+        self.length = None
+        self.will_close = False
+
+    def getheader(self, name, default=None):
+        return self.headers.get(name, default)
+
+
+class HttpPool:
+    # Keep-alive connections, one per (thread, host), so thousands of tiny asset
+    # requests don't each pay for a fresh TCP + TLS handshake. The per-host
+    # semaphore stops us from hammering a single server with every worker at once.
+    def __init__(self, per_host=DEFAULT_PER_HOST, timeout=30):
+        self.per_host = per_host
+        self.timeout = timeout
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._host_limits = {}
+        self._all_connections = []
+
+    def _limit(self, netloc):
+        with self._lock:
+            if netloc not in self._host_limits:
+                self._host_limits[netloc] = threading.BoundedSemaphore(self.per_host)
+            return self._host_limits[netloc]
+
+    def _connection(self, scheme, netloc, fresh=False):
+        connections = getattr(self._local, "connections", None)
+        if connections is None:
+            connections = self._local.connections = {}
+        key = (scheme, netloc)
+        conn = connections.get(key)
+        if conn is not None and fresh:
+            conn.close()
+            conn = None
+        if conn is None:
+            conn_class = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+            conn = conn_class(netloc, timeout=self.timeout)
+            connections[key] = conn
+            with self._lock:
+                self._all_connections.append(conn)
+        return conn
+
+    def request(self, url, sink, headers=None, redirects=5, on_response=None):
+        # Streams the body of url into sink(chunk). Returns the final response.
+        # on_response(response) gets to look at the status and headers first.
+        while True:
+            parts = urlsplit(url)
+            if parts.scheme == "file":
+                return self._request_local(unquote(parts.path), url, sink, headers, on_response)
+            response, location = self._request_once(url, parts, sink, headers, on_response, follow=redirects > 0)
+            if not location:
+                return response
+            # Followed outside the per-host slot we just gave back - a redirect to
+            # the same host would otherwise wait on itself forever with per_host=1
+            url = urljoin(url, location)
+            redirects -= 1
+
+    def _request_once(self, url, parts, sink, headers, on_response, follow):
+        # (response, None), or (response, Location) for a redirect we should follow
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+        request_headers = {"User-Agent": USER_AGENT, "Connection": "keep-alive"}
+        if headers:
+            request_headers.update(headers)
+
+        with self._limit(parts.netloc):
+            for attempt in range(2):
+                # A keep-alive connection the server already closed only shows up
+                # once we use it, so retry exactly once on a fresh socket
+                conn = self._connection(parts.scheme, parts.netloc, fresh=attempt > 0)
+                try:
+                    conn.request("GET", path, headers=request_headers)
+                    response = conn.getresponse()
+                    break
+                except (http.client.RemoteDisconnected, http.client.BadStatusLine, ConnectionError, BrokenPipeError):
+                    conn.close()
+                    if attempt:
+                        raise
+                except BaseException:
+                    # DNS failure, timeout, ... - leaves the connection half-used
+                    conn.close()
+                    raise
+            if response.status in (301, 302, 303, 307, 308):
+                location = response.getheader("Location")
+                response.read()
+                if response.will_close:
+                    conn.close()
+                if not follow:
+                    # Out of redirects - a redirect body is no substitute for the file
+                    raise DownloadError(f"Too many redirects for {url}", response.status)
+                if not location:
+                    raise DownloadError(f"Redirect without Location from {url}")
+                return response, location
+            if response.status >= 400:
+                response.read()
+                if response.status >= 500:
+                    raise TransientDownloadError(f"HTTP {response.status} for {url}", response.status)
+                raise DownloadError(f"HTTP {response.status} for {url}", response.status)
+            try:
+                if on_response:
+                    on_response(response)
+                while True:
+                    chunk = response.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    sink(chunk)
+                if response.length:
+                    # read(amt) just returns b"" when the server hangs up early,
+                    # it doesn't complain about the missing bytes by itself
+                    raise http.client.IncompleteRead(b"", response.length)
+            except BaseException:
+                # Half-read response, the connection can't be reused
+                conn.close()
+                raise
+            if response.will_close:
+                conn.close()
+            return response, None
+
+    def _request_local(self, path, url, sink, headers, on_response):
+        # A mirror on a local disk or network share - same interface, no sockets
+        try:
+            f = open(path, "rb")
+        except FileNotFoundError:
+            raise DownloadError(f"HTTP 404 for {url}", 404)
+        with f:
+            st = os.fstat(f.fileno())
+            response_headers = {"Last-Modified": formatdate(st.st_mtime, usegmt=True)}
+            status = 200
+            offset = 0
+            byte_range = (headers or {}).get("Range", "")
+            if byte_range.startswith("bytes=") and byte_range.endswith("-"):
+                offset = int(byte_range[6:-1])
+                if offset >= st.st_size:
+                    raise DownloadError(f"HTTP 416 for {url}", 416)
+                status = 206
+                f.seek(offset)
+            response = LocalResponse(status, response_headers)
+            if on_response:
+                on_response(response)
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                sink(chunk)
+        return response
+
+    def fetch_bytes(self, url):
+        chunks = []
+        self.request(url, chunks.append)
+        return b"".join(chunks)
+
+    def fetch_json(self, url):
+        return json.loads(self.fetch_bytes(url))
+
+    def close(self):
+        with self._lock:
+            for conn in self._all_connections:
+                conn.close()
+            self._all_connections.clear()
+
+
+class RateLimiter:
+    # Shared bandwidth cap for all download threads (bytes per second). Each chunk
+    # books its slot on a common timeline and sleeps until that slot comes up.
+    def __init__(self, rate):
+        self.rate = float(rate)
+        self._lock = threading.Lock()
+        self._next_free = time.monotonic()
+
+    def consume(self, amount):
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_free)
+            self._next_free = start + amount / self.rate
+        if start > now:
+            time.sleep(start - now)
+
+
+def _os_name():
+    return {"Windows": "windows", "Darwin": "osx"}.get(platform.system(), "linux")
+
+
+def mirror_url(config):
+    # "mirror" in the config: a URL or a local directory laid out like
+    # minecraft_dir, with version_manifest_v2.json at the top (what an exported
+    # mirror pack unpacks to). Returned as a base URL ending in /, or None.
+    mirror = (config or {}).get("mirror")
+    if not mirror:
+        return None
+    if "://" not in mirror:
+        mirror = pathlib.Path(os.path.abspath(os.path.expanduser(mirror))).as_uri()
+    return mirror if mirror.endswith("/") else mirror + "/"
+
+
+def manifest_url_for(config):
+    mirror = mirror_url(config)
+    return urljoin(mirror, "version_manifest_v2.json") if mirror else MANIFEST_URL
+
+
+def rules_allow(rules, features=None):
+    # Mojang's library rules: no rules means allowed, otherwise the last matching rule wins
+    if not rules:
+        return True
+    features = features or {}
+    allowed = False
+    for rule in rules:
+        os_rule = rule.get("os", {})
+        if "name" in os_rule and os_rule["name"] != _os_name():
+            continue
+        if "arch" in os_rule and os_rule["arch"] == "x86" and platform.architecture()[0] != "32bit":
+            continue
+        if any(features.get(key) != value for key, value in rule.get("features", {}).items()):
+            continue
+        allowed = rule.get("action") == "allow"
+    return allowed
+
+
+def maven_path(name):
+    # "group:artifact:version[:classifier]" -> group/path/artifact/version/artifact-version[-classifier].jar
+    parts = name.split(":")
+    group, artifact, version = parts[0], parts[1], parts[2]
+    classifier = f"-{parts[3]}" if len(parts) > 3 else ""
+    return f"{group.replace('.', '/')}/{artifact}/{version}/{artifact}-{version}{classifier}.jar"
+
+
+class Downloader:
+    def __init__(self, minecraft_dir, workers=DEFAULT_WORKERS, per_host=DEFAULT_PER_HOST,
+                 manifest_url=MANIFEST_URL, resources_url=RESOURCES_URL, task=None, known_files=None,
+                 manifest=None, store=None, rate_limit=None, journal=None, retries=DEFAULT_RETRIES, mirror=None):
+        self.minecraft_dir = minecraft_dir
+        self.workers = max(1, int(workers))
+        self.manifest_url = manifest_url
+        self.resources_url = resources_url if resources_url.endswith("/") else resources_url + "/"
+        self.task = task
+        self.pool = HttpPool(per_host=max(1, int(per_host)))
+        # A cached manifest saves a round trip, we only refetch if it doesn't know the version
+        self._manifest = manifest
+        self._manifest_is_fresh = manifest is None
+        # {path: (size, sha1, mtime_ns)} from the install index - files that still
+        # match their recorded stat don't need to be rehashed
+        self.known_files = known_files or {}
+        # Shared content-addressed store (object_store.ObjectStore), checked before
+        # hitting the network and fed with everything we download
+        self.store = store
+        self.rate_limiter = RateLimiter(rate_limit) if rate_limit else None
+        # Half-finished big files, so a dropped connection (or a closed launcher)
+        # continues with a Range request instead of starting over
+        self.journal = journal or DownloadJournal()
+        self.retries = max(0, int(retries))
+        # Base URL of a mirror laid out like minecraft_dir (see mirror.py). Files
+        # come from there first, and from the real URL if the mirror lacks them
+        self.mirror = mirror
+        # Everything this install touched, so the caller can write a fresh index
+        self.installed_items = []
+        # Bytes, files, speed and per-phase timing - shown next to the progress bar
+        self.stats = TransferStats()
+        if task:
+            task.metrics = self.stats
+
+    @classmethod
+    def from_config(cls, minecraft_dir, config, **kwargs):
+        kwargs.setdefault("workers", config.get("download_workers", DEFAULT_WORKERS))
+        kwargs.setdefault("per_host", config.get("download_per_host", DEFAULT_PER_HOST))
+        kwargs.setdefault("rate_limit", config.get("download_rate_limit"))
+        kwargs.setdefault("retries", config.get("download_retries", DEFAULT_RETRIES))
+        mirror = mirror_url(config)
+        if mirror:
+            kwargs.setdefault("mirror", mirror)
+            kwargs.setdefault("manifest_url", manifest_url_for(config))
+        return cls(minecraft_dir, **kwargs)
+
+    def _report(self, status=None, current=None, total=None):
+        if self.task:
+            self.task.report(status, current, total)
+
+    def _check_cancelled(self):
+        if self.task:
+            self.task.token.raise_if_cancelled()
+
+    def version_json_path(self, version_id):
+        return os.path.join(self.minecraft_dir, "versions", version_id, f"{version_id}.json")
+
+    def manifest(self):
+        if self._manifest is None:
+            self._manifest = self.pool.fetch_json(self.manifest_url)
+            self._manifest_is_fresh = True
+        return self._manifest
+
+    def resolve_version(self, version_id):
+        # Locally present version JSONs win (that's how modloader profiles work),
+        # everything else comes from the manifest
+        path = self.version_json_path(version_id)
+        if os.path.isfile(path):
+            self.installed_items.append(DownloadItem(None, path, phase="version"))
+            with open(path, "r") as f:
+                return json.load(f)
+        entry = next((v for v in self.manifest().get("versions", []) if v["id"] == version_id), None)
+        if entry is None and not self._manifest_is_fresh:
+            self._manifest = None
+            entry = next((v for v in self.manifest().get("versions", []) if v["id"] == version_id), None)
+        if entry is None:
+            raise DownloadError(f"Version {version_id} not found in the version manifest")
+        item = DownloadItem(entry["url"], path, entry.get("sha1"), phase="version")
+        self._download_one(item)
+        self.installed_items.append(item)
+        with open(path, "r") as f:
+            return json.load(f)
+
+    def collect_items(self, version_data):
+        version_id = version_data["id"]
+        items = []
+        natives = []
+
+        for lib in version_data.get("libraries", []):
+            if not rules_allow(lib.get("rules")):
+                continue
+            downloads = lib.get("downloads", {})
+            artifact = downloads.get("artifact")
+            if artifact:
+                path = artifact.get("path") or maven_path(lib["name"])
+                if artifact.get("url"):
+                    items.append(DownloadItem(artifact["url"], os.path.join(self.minecraft_dir, "libraries", path),
+                                              artifact.get("sha1"), artifact.get("size"), "libraries"))
+            elif "downloads" not in lib:
+                # Old-style maven library (modloaders love these)
+                path = maven_path(lib["name"])
+                base = lib.get("url") or LIBRARIES_URL
+                items.append(DownloadItem(urljoin(base if base.endswith("/") else base + "/", path),
+                                          os.path.join(self.minecraft_dir, "libraries", path), phase="libraries"))
+
+            classifier = lib.get("natives", {}).get(_os_name())
+            if classifier:
+                classifier = classifier.replace("${arch}", "32" if platform.architecture()[0] == "32bit" else "64")
+                native = downloads.get("classifiers", {}).get(classifier)
+                if native:
+                    path = os.path.join(self.minecraft_dir, "libraries", native["path"])
+                    items.append(DownloadItem(native["url"], path, native.get("sha1"), native.get("size"), "natives"))
+                    natives.append((path, lib.get("extract", {}).get("exclude", [])))
+
+        client = version_data.get("downloads", {}).get("client")
+        if client:
+            items.append(DownloadItem(client["url"], os.path.join(self.minecraft_dir, "versions", version_id, f"{version_id}.jar"),
+                                      client.get("sha1"), client.get("size"), "jar"))
+
+        logging_config = version_data.get("logging", {}).get("client", {}).get("file")
+        if logging_config:
+            items.append(DownloadItem(logging_config["url"], os.path.join(self.minecraft_dir, "assets", "log_configs", logging_config["id"]),
+                                      logging_config.get("sha1"), logging_config.get("size"), "assets"))
+        return items, natives
+
+    def asset_index_item(self, version_data):
+        asset_index = version_data.get("assetIndex")
+        if not asset_index:
+            return None
+        index_path = os.path.join(self.minecraft_dir, "assets", "indexes", f"{version_data.get('assets', asset_index['id'])}.json")
+        return DownloadItem(asset_index["url"], index_path, asset_index.get("sha1"), asset_index.get("size"), "assets")
+
+    def asset_items(self, version_data):
+        index_item = self.asset_index_item(version_data)
+        if not index_item:
+            return []
+        self._download_one(index_item)
+        self.installed_items.append(index_item)
+        return self.asset_object_items(index_item.path)
+
+    def asset_object_items(self, index_path):
+        # The objects an asset index already on disk lists
+        with open(index_path, "r") as f:
+            objects = json.load(f).get("objects", {})
+        items = []
+        seen = set()
+        for obj in objects.values():
+            sha1 = obj["hash"]
+            if sha1 in seen:
+                continue  # Plenty of sounds share a hash, no point fetching them twice
+            seen.add(sha1)
+            items.append(DownloadItem(f"{self.resources_url}{sha1[:2]}/{sha1}",
+                                      os.path.join(self.minecraft_dir, "assets", "objects", sha1[:2], sha1),
+                                      sha1, obj.get("size"), "assets"))
+        return items
+
+    def expected_items(self, version_id):
+        # Every file an install of version_id would produce, parents included
+        items = []
+        seen = set()
+        while version_id and version_id not in seen:
+            seen.add(version_id)
+            version_data = self.resolve_version(version_id)
+            version_items, natives = self.collect_items(version_data)
+            items.extend(version_items)
+            items.extend(self.asset_items(version_data))
+            version_id = version_data.get("inheritsFrom")
+        return items
+
+    def is_present(self, item):
+        if not os.path.isfile(item.path):
+            return False
+        st = os.stat(item.path)
+        if item.size is not None and st.st_size != item.size:
+            return False
+        if item.sha1 is None:
+            return True
+        known = self.known_files.get(item.path)
+        if known and known[1] == item.sha1 and known[0] == st.st_size and known[2] == st.st_mtime_ns:
+            return True
+        return sha1_of_file(item.path) == item.sha1
+
+    def download_file(self, item):
+        if self.is_present(item):
+            if self.store and item.sha1:
+                self.store.dedupe(item.path, item.sha1)  # Existing installs get deduplicated too
+            return 0
+        if self.store and item.sha1:
+            if os.path.exists(item.path) and self.store.is_shared(item.path, item.sha1):
+                # We're looking at the stored copy and it's bad, don't hand it out again
+                self.store.discard(item.sha1)
+            elif self.store.materialize(item.sha1, item.path):
+                return 0
+        os.makedirs(os.path.dirname(item.path), exist_ok=True)
+        if self.mirror:
+            mirrored = urljoin(self.mirror, os.path.relpath(item.path, self.minecraft_dir).replace(os.sep, "/"))
+            try:
+                written = self._fetch_with_retries(item, mirrored)
+            except DownloadError as e:
+                if e.status != 404 or not urlsplit(item.url).scheme:
+                    raise
+                # Not on the mirror, go to the source
+                logging.info(f"{mirrored} is not on the mirror, fetching {item.url}")
+                written = self._fetch_with_retries(item, item.url)
+        else:
+            written = self._fetch_with_retries(item, item.url)
+        if self.store and item.sha1:
+            self.store.add(item.path, item.sha1)
+        return written
+
+    def _fetch_with_retries(self, item, url):
+        for attempt in range(self.retries + 1):
+            try:
+                return self._fetch(item, url)
+            except RETRYABLE_ERRORS as e:
+                # Flaky link: back off a little and go again - big files pick up
+                # from where they stopped
+                if attempt >= self.retries:
+                    raise
+                self._check_cancelled()
+                logging.info(f"Download of {url} failed ({e}), retry {attempt + 1}/{self.retries}.")
+                time.sleep(RETRY_DELAY * (attempt + 1))
+
+    def _fetch(self, item, url):
+        # Returns the number of bytes that actually came over the network
+        resumable = item.size is None or item.size >= RESUME_MIN_SIZE
+        if resumable:
+            part_path = f"{item.path}.part"
+            f = open(part_path, "a+b")
+            try:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                # Another download of the same file is still going (a prefetch
+                # winding down, say) - don't fight over its .part
+                f.close()
+                resumable = False
+        if not resumable:
+            part_path = f"{item.path}.{threading.get_ident()}.tmp"
+            f = open(part_path, "w+b")
+        try:
+            return self._fetch_into(item, url, f, part_path, resumable)
+        except BaseException:
+            if not resumable and os.path.exists(part_path):
+                os.remove(part_path)
+            raise
+        finally:
+            f.close()
+
+    def _fetch_into(self, item, url, f, part_path, resumable):
+        state = {"digest": hashlib.sha1(), "written": 0, "ready": 0}
+        offset = 0
+        if resumable:
+            entry = self.journal.get(part_path)
+            f.seek(0, os.SEEK_END)
+            if entry and entry["url"] == url and entry["sha1"] == item.sha1 and f.tell():
+                offset = f.tell()
+            if item.size is not None and offset > item.size:
+                offset = 0
+            if offset:
+                # The hash has to cover the bytes we already have
+                f.seek(0)
+                for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                    state["digest"].update(chunk)
+                logging.info(f"Resuming {os.path.basename(item.path)} at {offset} bytes.")
+            else:
+                f.truncate(0)  # Leftovers nobody vouches for
+
+        def on_response(response):
+            if offset and response.status != 206:
+                # Range ignored, or the file changed since (If-Range) - start over
+                f.truncate(0)
+                state["digest"] = hashlib.sha1()
+            elif offset:
+                # Resume accepted, the bytes we already had count towards the ETA now
+                state["ready"] += offset
+                self.stats.add_ready(offset)
+            if resumable and response.status != 206:
+                self.journal.record(part_path, url, item.sha1,
+                                    response.getheader("ETag") or response.getheader("Last-Modified"))
+
+        def sink(chunk):
+            self._check_cancelled()
+            if self.rate_limiter:
+                self.rate_limiter.consume(len(chunk))
+            state["digest"].update(chunk)
+            f.write(chunk)
+            state["written"] += len(chunk)
+            state["ready"] += len(chunk)
+            self.stats.add_bytes(item.phase, len(chunk))
+
+        try:
+            if not (offset and item.size == offset):
+                headers = {}
+                if offset:
+                    headers["Range"] = f"bytes={offset}-"
+                    if entry.get("validator"):
+                        headers["If-Range"] = entry["validator"]
+                try:
+                    self.pool.request(url, sink, headers, on_response=on_response)
+                except DownloadError as e:
+                    if offset and e.status == 416:
+                        # Our .part doesn't fit the file on the server anymore
+                        self.journal.remove(part_path)
+                        raise TransientDownloadError(f"Range not satisfiable for {url}") from e
+                    raise
+            f.flush()
+
+            if item.sha1 and state["digest"].hexdigest() != item.sha1:
+                self.journal.remove(part_path)
+                f.truncate(0)
+                if offset:
+                    raise TransientDownloadError(f"SHA1 mismatch for {url} after resuming, starting over")
+                raise DownloadError(f"SHA1 mismatch for {url}")
+        except BaseException:
+            # The retry credits whatever is still usable all over again
+            self.stats.add_ready(-state["ready"])
+            raise
+        os.replace(part_path, item.path)
+        if resumable:
+            self.journal.remove(part_path)
+        return state["written"]
+
+    def _download_one(self, item):
+        # Version JSONs and asset indexes, fetched one at a time ahead of the rest
+        self.stats.expect([item])
+        written = self._download_counted(item)
+        self.stats.file_done(item.phase, written > 0, item.size)
+        return written
+
+    def _download_counted(self, item):
+        self.stats.phase_started(item.phase)
+        return self.download_file(item)
+
+    def download_all(self, items, status="Downloading files"):
+        total = len(items)
+        done = 0
+        downloaded_bytes = 0
+        self.stats.expect(items)
+        self._report(status, 0, total)
+        executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="download")
+        try:
+            futures = {executor.submit(self._download_counted, item): item for item in items}
+            for future in as_completed(futures):
+                written = future.result()
+                downloaded_bytes += written
+                done += 1
+                item = futures[future]
+                self.stats.file_done(item.phase, written > 0, item.size)
+                self._report(status, done, total)
+        except BaseException:
+            # Don't leave the rest of the queue running behind our back
+            executor.shutdown(wait=True, cancel_futures=True)
+            raise
+        executor.shutdown(wait=True)
+        return downloaded_bytes
+
+    def extract_natives(self, version_id, natives):
+        natives_dir = os.path.join(self.minecraft_dir, "versions", version_id, "natives")
+        for jar_path, exclude in natives:
+            with zipfile.ZipFile(jar_path) as zf:
+                for member in zf.namelist():
+                    if any(member.startswith(prefix) for prefix in exclude):
+                        continue
+                    zf.extract(member, natives_dir)
+
+    def install(self, version_id):
+        return self._install(version_id)[0]
+
+    def _install(self, version_id):
+        # (version JSON, natives of the whole inheritsFrom chain)
+        start = time.monotonic()
+        self._report(f"Resolving {version_id}")
+        version_data = self.resolve_version(version_id)
+
+        parent_id = version_data.get("inheritsFrom")
+        parent_natives = []
+        if parent_id:
+            parent_natives = self._install(parent_id)[1]
+
+        items, natives = self.collect_items(version_data)
+        # The game only looks in versions/<launched id>/natives, so an inheriting
+        # profile (Forge, OptiFine, ...) needs its parents' natives in there too.
+        # Parents first, a native the profile ships itself wins
+        natives = parent_natives + natives
+        self._check_cancelled()
+        with tracing.span("asset_index", version=version_id):
+            items.extend(self.asset_items(version_data))
+        with tracing.span("download_all", version=version_id, files=len(items)):
+            downloaded_bytes = self.download_all(items, f"Downloading {version_id}")
+        self.installed_items.extend(items)
+        with self.stats.timed("extract"), tracing.span("extract_natives", version=version_id):
+            self.extract_natives(version_data["id"], natives)
+
+        # Old modloader profiles don't ship a jar of their own and expect the parent's
+        jar_path = os.path.join(self.minecraft_dir, "versions", version_data["id"], f"{version_data['id']}.jar")
+        if parent_id and not os.path.isfile(jar_path):
+            parent_jar = os.path.join(self.minecraft_dir, "versions", parent_id, f"{parent_id}.jar")
+            if os.path.isfile(parent_jar):
+                shutil.copyfile(parent_jar, jar_path)
+                self.installed_items.append(DownloadItem(None, jar_path, phase="jar"))
+
+        logging.info(f"Installed {version_id}: {len(items)} files checked, {downloaded_bytes} bytes downloaded "
+                     f"in {time.monotonic() - start:.2f}s with {self.workers} workers")
+        return version_data, natives
+
+    def close(self):
+        self.pool.close()
@@ -0,0 +1,108 @@
+import json
+import logging
+import os
+import time
+
+from downloader import sha1_of_file
+
+# 2: inheriting versions get their parents' natives, older indexes vouch for
+# installs that lack them
+INDEX_FORMAT = 2
+# Stat checks catch almost everything, but silent bit rot keeps size and mtime
+# intact - so once in a while we do pay for a full rehash
+REHASH_AFTER = 30 * 24 * 60 * 60
+
+
+class InstallIndex:
+    # One small JSON per installed version under data_dir/install-index, listing
+    # every file the version needs as [relative path, size, sha1, mtime_ns].
+    # A warm launch only has to stat() those files instead of rehashing them all.
+    def __init__(self, data_dir, minecraft_dir=None):
+        self.index_dir = os.path.join(data_dir, "install-index")
+        self.minecraft_dir = minecraft_dir or data_dir
+
+    def _path(self, version_id):
+        return os.path.join(self.index_dir, f"{version_id}.json")
+
+    def load(self, version_id):
+        try:
+            with open(self._path(version_id), "r") as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+        if data.get("format") != INDEX_FORMAT:
+            return None
+        return data
+
+    def save(self, version_id, files, verified_at=None):
+        # files: iterable of (absolute path, sha1 or None)
+        entries = []
+        for path, sha1 in files:
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue  # Something optional that didn't end up on disk
+            entries.append([os.path.relpath(path, self.minecraft_dir), st.st_size, sha1, st.st_mtime_ns])
+        data = {
+            "format": INDEX_FORMAT,
+            "version": version_id,
+            "verified_at": verified_at or time.time(),
+            "files": entries
+        }
+        os.makedirs(self.index_dir, exist_ok=True)
+        temp_path = self._path(version_id) + ".tmp"
+        with open(temp_path, "w") as f:
+            json.dump(data, f)
+        os.replace(temp_path, self._path(version_id))
+
+    def invalidate(self, version_id):
+        try:
+            os.remove(self._path(version_id))
+        except FileNotFoundError:
+            pass
+
+    def known_files(self, version_id):
+        data = self.load(version_id)
+        if not data:
+            return {}
+        return {os.path.join(self.minecraft_dir, rel): (size, sha1, mtime_ns) for rel, size, sha1, mtime_ns in data["files"]}
+
+    def is_installed(self, version_id):
+        data = self.load(version_id)
+        if not data or not data["files"]:
+            return False
+        for rel, size, sha1, mtime_ns in data["files"]:
+            try:
+                st = os.stat(os.path.join(self.minecraft_dir, rel))
+            except OSError:
+                logging.info(f"Install index for {version_id}: {rel} is missing")
+                return False
+            if st.st_size != size or st.st_mtime_ns != mtime_ns:
+                logging.info(f"Install index for {version_id}: {rel} changed on disk")
+                return False
+        return True
+
+    def is_stale(self, version_id):
+        data = self.load(version_id)
+        return not data or time.time() - data.get("verified_at", 0) > REHASH_AFTER
+
+    def rehash(self, version_id):
+        # Full check of every file against its recorded SHA1. Returns the relative
+        # paths that don't match and refreshes verified_at if everything is fine.
+        data = self.load(version_id)
+        if not data:
+            return None
+        bad = []
+        files = []
+        for rel, size, sha1, mtime_ns in data["files"]:
+            path = os.path.join(self.minecraft_dir, rel)
+            if not os.path.isfile(path) or (sha1 and sha1_of_file(path) != sha1):
+                bad.append(rel)
+            else:
+                files.append((path, sha1))
+        if bad:
+            self.invalidate(version_id)
+        else:
+            # Content checks out, so pick up any new mtimes along with verified_at
+            self.save(version_id, files)
+        return bad
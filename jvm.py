@@ -0,0 +1,158 @@
+import hashlib
+import logging
+import os
+
+from launch_plan import version_fingerprint
+from runtimes import required_java
+
+DEFAULT_PROFILE = "auto"
+
+# (share of RAM for the heap, smallest heap, biggest heap) in MiB. "auto" is
+# balanced, "off" leaves the JVM on its own defaults like we used to.
+PROFILES = {
+    "low": (0.125, 512, 1024),
+    "balanced": (0.25, 1024, 4096),
+    "performance": (0.5, 2048, 8192),
+}
+OS_RESERVE = 1024  # Never hand the heap the last GiB, the game has native memory too
+HEAP_STEP = 256
+
+
+def system_memory_mb():
+    # Total RAM, or the container's limit if that's lower
+    total = None
+    try:
+        with open("/proc/meminfo", "r") as f:
+            for line in f:
+                if line.startswith("MemTotal:"):
+                    total = int(line.split()[1]) // 1024
+                    break
+    except OSError:
+        pass
+    if total is None:
+        try:
+            total = os.sysconf("SC_PHYS_PAGES") * os.sysconf("SC_PAGE_SIZE") // (1024 * 1024)
+        except (AttributeError, ValueError, OSError):
+            total = 4096  # No idea, assume a modest machine
+    try:
+        with open("/sys/fs/cgroup/memory.max", "r") as f:
+            limit = f.read().strip()
+        if limit != "max":
+            total = min(total, int(limit) // (1024 * 1024))
+    except (OSError, ValueError):
+        pass
+    return total
+
+
+def cpu_cores():
+    # Only the cores we're actually allowed to run on (taskset, cgroups)
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def java_major_version(version_id, minecraft_dir):
+    # What the version asks for - the runtime we end up on may be newer
+    requirement = required_java(version_id, minecraft_dir)
+    if requirement and requirement.get("majorVersion"):
+        return int(requirement["majorVersion"])
+    return None
+
+
+def heap_size_mb(profile, total_mb):
+    share, smallest, biggest = PROFILES[profile]
+    heap = min(max(int(total_mb * share), smallest), biggest)
+    heap = min(heap, max(total_mb - OS_RESERVE, 512))
+    return max(heap // HEAP_STEP * HEAP_STEP, 512)
+
+
+def gc_arguments(gc, profile, cores):
+    if gc == "serial":
+        return ["-XX:+UseSerialGC"]
+    if gc == "parallel":
+        return ["-XX:+UseParallelGC", f"-XX:ParallelGCThreads={cores}"]
+    if gc == "zgc":
+        return ["-XX:+UseZGC", f"-XX:ConcGCThreads={max(1, cores // 4)}"]
+    # G1 with a short pause target is what keeps the world from hitching while
+    # chunks load. Leave a core for the game's own threads on small machines
+    parallel = cores if cores <= 4 else cores - 1
+    if profile == "low":
+        parallel = max(1, parallel // 2)
+    return [
+        "-XX:+UseG1GC",
+        f"-XX:MaxGCPauseMillis={100 if profile == 'low' else 50}",
+        f"-XX:ParallelGCThreads={parallel}",
+        f"-XX:ConcGCThreads={max(1, parallel // 4)}",
+        "-XX:+ParallelRefProcEnabled",
+    ]
+
+
+def appcds_arguments(version_id, minecraft_dir, data_dir, java_major):
+    # Class-data sharing archive of everything the game loaded on a previous
+    # run, so the next start maps those classes instead of parsing and
+    # verifying them again. Lives under cache/cds/<version>/, named after the
+    # version fingerprint so a reinstall starts a fresh one.
+    if not java_major or java_major < 13:
+        return []  # Dynamic archives need JDK 13+
+    fingerprint = version_fingerprint(version_id, minecraft_dir)
+    if not fingerprint:
+        return []
+    archive_dir = os.path.join(data_dir, "cache", "cds", version_id)
+    archive_name = hashlib.sha1(fingerprint.encode()).hexdigest()[:16] + ".jsa"
+    archive_path = os.path.join(archive_dir, archive_name)
+    os.makedirs(archive_dir, exist_ok=True)
+    for name in os.listdir(archive_dir):
+        if name != archive_name:
+            try:
+                os.remove(os.path.join(archive_dir, name))
+            except OSError:
+                pass
+
+    if java_major >= 19:
+        # The JVM creates it, uses it and recreates it if it goes stale on its own
+        return ["-XX:+AutoCreateSharedArchive", f"-XX:SharedArchiveFile={archive_path}"]
+    if os.path.isfile(archive_path):
+        logging.info(f"Using AppCDS archive for {version_id}.")
+        return [f"-XX:SharedArchiveFile={archive_path}"]
+    # First run: dump the archive when the game exits, the next launch gets it
+    logging.info(f"Creating AppCDS archive for {version_id} when the game exits.")
+    return [f"-XX:ArchiveClassesAtExit={archive_path}"]
+
+
+def jvm_arguments(version_id, minecraft_dir, data_dir=None, config=None, java_major=None):
+    # Heap, GC and thread counts picked from the machine this runs on. Config:
+    #   "jvm_profile": "auto" | "low" | "balanced" | "performance" | "off"
+    #   "jvm_appcds": true to build and reuse an AppCDS archive per version
+    #   "jvm_extra_args": [...] appended as-is
+    #   "jvm_overrides": {"<version>": {"profile", "max_memory", "min_memory",
+    #                     "gc", "appcds", "extra_args"}} wins over all of the above
+    config = config or {}
+    overrides = (config.get("jvm_overrides") or {}).get(version_id) or {}
+    profile = overrides.get("profile") or config.get("jvm_profile") or DEFAULT_PROFILE
+    if profile == "auto":
+        profile = "balanced"
+    extra_args = list(config.get("jvm_extra_args") or []) + list(overrides.get("extra_args") or [])
+    if profile == "off":
+        return extra_args
+    if profile not in PROFILES:
+        logging.warning(f"Unknown JVM profile {profile}, using balanced.")
+        profile = "balanced"
+
+    total_mb = system_memory_mb()
+    cores = cpu_cores()
+    max_memory = int(overrides.get("max_memory") or heap_size_mb(profile, total_mb))
+    # A fixed-size heap never stops to grow, the others start at half and grow as needed
+    min_memory = int(overrides.get("min_memory") or (max_memory if profile == "performance" else max_memory // 2))
+    min_memory = min(min_memory, max_memory)
+    gc = (overrides.get("gc") or ("serial" if cores < 2 else "g1")).lower()
+
+    args = [f"-Xmx{max_memory}M", f"-Xms{min_memory}M"]
+    args += gc_arguments(gc, profile, cores)
+    appcds = overrides.get("appcds", config.get("jvm_appcds", False))
+    if appcds and data_dir:
+        args += appcds_arguments(version_id, minecraft_dir, data_dir,
+                                 java_major or java_major_version(version_id, minecraft_dir))
+    args += extra_args
+    logging.info(f"JVM profile {profile} for {version_id}: {max_memory} MiB heap, {gc} GC "
+                 f"({total_mb} MiB RAM, {cores} cores).")
+    return args
@@ -0,0 +1,104 @@
+import hashlib
+import json
+import logging
+import os
+
+PLAN_FORMAT = 1
+
+# Stand-ins for the per-launch values. get_minecraft_command bakes them into the
+# command like any other option, and we swap in the real ones on every launch.
+PER_LAUNCH_PLACEHOLDERS = {
+    "username": "@@HACKERMAN_USERNAME@@",
+    "uuid": "@@HACKERMAN_UUID@@",
+    "token": "@@HACKERMAN_TOKEN@@",
+    "sessionid": "@@HACKERMAN_SESSIONID@@",
+}
+
+
+def version_fingerprint(version_id, minecraft_dir):
+    # Size + mtime of the version JSON and every inheritsFrom parent. Any reinstall
+    # or modloader update touches at least one of them.
+    parts = []
+    seen = set()
+    while version_id and version_id not in seen:
+        seen.add(version_id)
+        path = os.path.join(minecraft_dir, "versions", version_id, f"{version_id}.json")
+        try:
+            st = os.stat(path)
+            with open(path, "r") as f:
+                parent = json.load(f).get("inheritsFrom")
+        except (OSError, json.JSONDecodeError):
+            return None
+        parts.append(f"{version_id}:{st.st_size}:{st.st_mtime_ns}")
+        version_id = parent
+    return "|".join(parts)
+
+
+def options_key(options):
+    # Everything that isn't per-launch still changes the command (JVM args, game dir, ...)
+    stable = {key: value for key, value in options.items() if key not in PER_LAUNCH_PLACEHOLDERS}
+    return hashlib.sha1(json.dumps(stable, sort_keys=True).encode()).hexdigest()
+
+
+class LaunchPlanCache:
+    # Resolved launch commands (JVM args, classpath, main class, game args) per
+    # version, with the per-launch bits left as placeholders. Saves re-parsing the
+    # version JSONs and re-evaluating every library rule on each launch.
+    def __init__(self, data_dir):
+        self.cache_dir = os.path.join(data_dir, "cache", "launch-plans")
+
+    def _path(self, version_id):
+        return os.path.join(self.cache_dir, f"{version_id}.json")
+
+    def invalidate(self, version_id):
+        try:
+            os.remove(self._path(version_id))
+        except FileNotFoundError:
+            pass
+
+    def _load(self, version_id, fingerprint, key):
+        try:
+            with open(self._path(version_id), "r") as f:
+                plan = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+        if plan.get("format") != PLAN_FORMAT or plan.get("fingerprint") != fingerprint or plan.get("options_key") != key:
+            return None
+        return plan
+
+    def _save(self, version_id, plan):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        temp_path = self._path(version_id) + ".tmp"
+        with open(temp_path, "w") as f:
+            json.dump(plan, f)
+        os.replace(temp_path, self._path(version_id))
+
+    def get_command(self, version_id, minecraft_dir, options, build):
+        # build(version_id, minecraft_dir, options) -> command list, normally
+        # mll.command.get_minecraft_command. Only called on a cache miss.
+        fingerprint = version_fingerprint(version_id, minecraft_dir)
+        key = options_key(options)
+        plan = self._load(version_id, fingerprint, key) if fingerprint else None
+        if plan is None:
+            template_options = dict(options)
+            template_options.update(PER_LAUNCH_PLACEHOLDERS)
+            command = build(version_id, minecraft_dir, template_options)
+            plan = {
+                "format": PLAN_FORMAT,
+                "fingerprint": fingerprint,
+                "options_key": key,
+                "command": command
+            }
+            if fingerprint:
+                self._save(version_id, plan)
+            logging.info(f"Built launch plan for {version_id}.")
+        else:
+            logging.info(f"Using cached launch plan for {version_id}.")
+
+        command = []
+        for arg in plan["command"]:
+            for name, placeholder in PER_LAUNCH_PLACEHOLDERS.items():
+                if placeholder in arg:
+                    arg = arg.replace(placeholder, str(options.get(name, "")))
+            command.append(arg)
+        return command
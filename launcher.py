@@ -1,48 +1,35 @@
 #! /usr/bin/env python3
 import gi
 gi.require_version("Gtk", "3.0")
-from gi.repository import Gtk
+from gi.repository import Gtk, GLib
 import os
-import json
-import subprocess
-import minecraft_launcher_lib as mll
-import uuid
 import logging
 
+from tasks import TaskRunner, CancelledError
+from config_store import ConfigStore, setup_logging
+from downloader import manifest_url_for
+from manifest_cache import ManifestCache, with_local_versions
+from version_index import VersionIndex
+from prefetch import Prefetcher
+from supervisor import Supervisor
+import pipeline
+import tracing
+
+VERSION_TYPE_FILTERS = [
+    ("release", "Releases"),
+    ("snapshot", "Snapshots"),
+    ("old_beta", "Old Beta"),
+    ("old_alpha", "Old Alpha"),
+    ("all", "All versions")
+]
+VERSION_TYPE_IDS = {version_type for version_type, label in VERSION_TYPE_FILTERS}
+# Rows added to the version dropdown per main loop iteration
+VERSION_ROW_BATCH = 100
+# Let startup settle before prefetching, and don't restart it for every version
+# the user scrolls past
+PREFETCH_STARTUP_DELAY = 5
+PREFETCH_SELECT_DELAY = 2
 
-class DownloadProgressCallback:
-    def __init__(self):
-        # Just keeping track of download progress - nothing fancy here
-        self.total = 0
-        self.current = 0
-        self.status = ""
-
-    def set_max(self, max_value):
-        self.total = max_value
-        logging.debug(f"Download Max Set: {self.total}")
-
-    def set_progress(self, progress):
-        self.current = progress
-        if self.total > 0:
-            percentage = (self.current / self.total) * 100
-            logging.debug(f"Download Progress: {self.current}/{self.total} ({percentage:.2f}%)")
-        else:
-            logging.debug(f"Download Progress: {self.current}")
-
-    def set_status(self, status):
-        self.status = status
-        logging.debug(f"Download Status: {self.status}")
-
-    def get(self, key, default=None):
-        # This is basically a callback dispatcher for the minecraft-launcher-lib
-        # They expect certain method names, so we're just routing them
-        if key == "setStatus":
-            return self.set_status
-        elif key == "setMax":
-            return self.set_max
-        elif key == "setProgress":
-            return self.set_progress
-        return default
 
 class MinecraftLauncher(Gtk.Application):
     def __init__(self):
@@ -50,21 +37,13 @@ class MinecraftLauncher(Gtk.Application):
         self.connect("activate", self.on_activate)
         
         # Store everything in the proper XDG config directory (because we're not savages)
-        xdg_config_home = os.environ.get("XDG_CONFIG_HOME", os.path.join(os.path.expanduser("~"), ".config"))
-        self.data_dir = os.path.join(xdg_config_home, "hackerman-launcher")
+        self.data_dir = pipeline.default_data_dir()
         self.mll_data_dir = self.data_dir
 
         # Set up logging so we can actually debug things when they break
-        os.makedirs(self.data_dir, exist_ok=True)
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler(os.path.join(self.data_dir, "launcher.log")),
-                logging.StreamHandler() # Also print to console for immediate feedback
-            ]
-        )
+        setup_logging(self.data_dir)
         logging.info("Launcher initialized and logging configured.")
+        tracing.enable_from_env()
 
         # We don't need to initialize mll here, but we do need self.data_dir ready
         # for when mll functions get called later
@@ -75,15 +54,19 @@ class MinecraftLauncher(Gtk.Application):
         # os.makedirs(os.path.join(self.data_dir, "assets"), exist_ok=True)
         # os.makedirs(os.path.join(self.data_dir, "libraries"), exist_ok=True)
 
-        self.version_manifest_url = "https://piston-meta.mojang.com/mc/game/version_manifest.json"
-        self.versions = {}
+        self.manifest_cache = None  # Set up in load_config, once we know about a mirror
+        self.versions = VersionIndex()
+        self.version_rows = {}  # version id -> row in the (filtered) dropdown model
+        self.version_row_loader = None
 
         self.config_file = os.path.join(self.data_dir, "config.json")
-        self.config = {
+        self.config = ConfigStore(self.config_file, {
             "accounts": [],
             "selected_account": None,
-            "selected_version_id": None
-        }
+            "selected_version_id": None,
+            "instances": [],
+            "selected_instance": pipeline.DEFAULT_INSTANCE
+        })
 
         self.selected_account = None
         self.selected_version_id = None
@@ -91,6 +74,22 @@ class MinecraftLauncher(Gtk.Application):
 
         self.config_loaded = False  # Don't save until we've actually loaded something
 
+        # Installs and launches run here so the window never freezes during a download.
+        # Everything the worker wants to tell the UI goes through GLib.idle_add
+        self.task_runner = TaskRunner(dispatch=GLib.idle_add)
+        # Separate worker for small background chores (like refreshing the version
+        # list) so they don't end up queued behind a multi-GB install
+        self.background_runner = TaskRunner(dispatch=GLib.idle_add)
+        # And one more for the idle-time prefetch of the selected version
+        self.prefetch_runner = TaskRunner(dispatch=GLib.idle_add)
+        self.prefetcher = Prefetcher(self.prefetch_runner, self.mll_data_dir, self.data_dir)
+        self.prefetch_timer = None
+
+        # Every game we start, with its output and resource usage
+        self.supervisor = Supervisor(os.path.join(self.data_dir, "logs", "games"))
+        self.instance_rows = {}  # supervisor instance id -> row iter on the Instances page
+        self.shown_log = (None, 0)  # (instance id, lines_seen) currently in the log view
+
         # Handle migration from the old config location (because I moved it to XDG)
         old_config_path = os.path.join(os.path.expanduser("~"), ".hackerman-launcher", "config.json")
         if os.path.exists(old_config_path) and not os.path.exists(self.config_file):
@@ -127,100 +126,77 @@ class MinecraftLauncher(Gtk.Application):
         self.game_page = self.create_game_page()
         self.stack.add_titled(self.game_page, "game_page", "Game")
 
+        self.instances_page = self.create_instances_page()
+        self.stack.add_titled(self.instances_page, "instances_page", "Instances")
+
         self.window.add(self.stack)
         self.window.show_all()
 
         self.load_config()
+        self._schedule_prefetch(PREFETCH_STARTUP_DELAY)
 
     def on_window_close(self, *args):
-        # Only save if we actually have something worth saving
-        if self.config and self.config.get("accounts") is not None:
+        # Stop any running download, otherwise mll keeps going until the process dies
+        self.task_runner.shutdown()
+        self.background_runner.shutdown()
+        self.prefetch_runner.shutdown()
+        # Write out anything still waiting in the debounce timer
+        if self.config_loaded:
             self.save_config()
+            self.config.flush()
         return False  # Let the window actually close
 
     def load_config(self):
         # Try to load the config file, but don't crash if it's missing or broken
-        loaded = {}
-        file_was_empty = False
-        if os.path.exists(self.config_file):
-            try:
-                with open(self.config_file, "r") as f:
-                    content = f.read().strip()
-                    if content:
-                        loaded = json.loads(content)
-                    else:
-                        file_was_empty = True
-                        logging.warning("Config file is empty, starting with defaults.")
-            except json.JSONDecodeError:
-                logging.error("Error: Could not decode config.json. Starting with default config.")
-
-        # Fill in any missing fields with defaults (backwards compatibility)
-        for key, value in self.config.items():
-            if key not in loaded:
-                loaded[key] = value
-        self.config = loaded
-
-        # Refresh the account list from our config
+        migration_needed = self.config.load()
+
+        # A configured mirror also serves the version list
+        self.manifest_cache = ManifestCache(self.data_dir, manifest_url_for(self.config))
+        self.load_versions()
+
+        # Refresh the account list from our config. Detaching the model while we
+        # fill it keeps the TreeView from reacting to every single row.
+        self.account_list_view.set_model(None)
         self.account_list_store.clear()
-        migration_needed = False
-
-        for i, account in enumerate(self.config["accounts"]):
-            # Handle old configs that stored accounts as just strings
-            if isinstance(account, str):
-                username = account
-                uuid_val = str(uuid.uuid3(uuid.NAMESPACE_OID, username))
-                account = {"username": username, "uuid": uuid_val}
-                self.config["accounts"][i] = account
-                migration_needed = True
-            # Make sure every account has a UUID (generate one if missing)
-            if not account.get("uuid"):
-                account["uuid"] = str(uuid.uuid3(uuid.NAMESPACE_OID, account["username"]))
-                self.config["accounts"][i] = account
-                migration_needed = True
-            self.account_list_store.append([account["username"]])
-        # Save the migrated config if we actually changed something
-        if migration_needed and not file_was_empty:
-            self.save_config()
+        selected_row = None
+        selected_account = self.config.get("selected_account")
+        for row, username in enumerate(self.config.usernames()):
+            self.account_list_store.append([username])
+            if username == selected_account:
+                selected_row = row
+        self.account_list_view.set_model(self.account_list_store)
 
         # Restore the previously selected account if it exists
-        if self.config.get("selected_account"):
-            self.selected_account = self.config["selected_account"]
-            for row in self.account_list_store:
-                if row[0] == self.selected_account:
-                    path = row.path
-                    self.account_list_view.get_selection().select_path(path)
-                    break
+        if selected_account:
+            self.selected_account = selected_account
+            if selected_row is not None:
+                self.account_list_view.get_selection().select_path(Gtk.TreePath(selected_row))
         else:
             self.selected_account = None
 
         self.selected_version_id = self.config.get("selected_version_id")
+        if self.selected_version_id in self.versions:
+            self._restore_version_selection()
+
+        self._populate_instances()
         self.config_loaded = True  # Okay, now it's safe to save config
 
+        # Save the migrated config if we actually changed something
+        if migration_needed:
+            self.save_config()
+
     def save_config(self):
         if not getattr(self, 'config_loaded', False):
             logging.warning("Attempted to save config before it was loaded. Skipping save.")
             return
-        # Build the accounts list from what's currently in the UI
-        accounts = []
-        usernames_in_store = set()
-        for row in self.account_list_store:
-            username = row[0]
-            usernames_in_store.add(username)
-            # Try to keep the existing UUID if we have one
-            existing = next((a for a in self.config["accounts"] if a.get("username") == username), None)
-            if existing and existing.get("uuid"):
-                uuid_val = existing["uuid"]
-            else:
-                uuid_val = str(uuid.uuid3(uuid.NAMESPACE_OID, username))
-            accounts.append({"username": username, "uuid": uuid_val})
-        self.config["accounts"] = accounts
+        # Accounts live in the config store already, only the UI state needs copying over
         self.config["selected_account"] = self.selected_account
         self.config["selected_version_id"] = self.selected_version_id
+        self.config["selected_instance"] = self._selected_instance()
         # Clean up any old fields we don't use anymore
-        if "selected_account_uuid" in self.config:
-            del self.config["selected_account_uuid"]
-        with open(self.config_file, "w") as f:
-            json.dump(self.config, f, indent=4)
+        self.config.pop("selected_account_uuid")
+        # Debounced - a burst of changes turns into a single write
+        self.config.save_soon()
 
     def create_account_page(self):
         vbox = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=10)
@@ -277,114 +253,419 @@ class MinecraftLauncher(Gtk.Application):
         vbox.set_margin_start(20)
         vbox.set_margin_end(20)
 
-        # Version selector dropdown
+        # Type filter and search box - Mojang's manifest has ~800 entries and
+        # nobody wants to scroll through all of them in one popup
+        self.version_type_combo = Gtk.ComboBoxText()
+        for version_type, label in VERSION_TYPE_FILTERS:
+            self.version_type_combo.append(version_type, label)
+        self.version_type_combo.set_active_id("release")
+        self.version_type_combo.connect("changed", self.on_version_filter_changed)
+
+        self.version_search_entry = Gtk.SearchEntry()
+        self.version_search_entry.set_placeholder_text("Filter versions")
+        self.version_search_entry.connect("search-changed", self.on_version_filter_changed)
+
+        hbox_filter = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=10)
+        hbox_filter.pack_start(self.version_type_combo, False, False, 0)
+        hbox_filter.pack_start(self.version_search_entry, True, True, 0)
+        vbox.pack_start(hbox_filter, False, False, 0)
+
+        # Version selector dropdown. Rows are (version id, label); placeholder rows
+        # like "Loading versions..." have an empty id so they can never be launched
         version_label = Gtk.Label(label="Minecraft Version:")
-        self.version_combo = Gtk.ComboBoxText()
-        self.version_combo.connect("changed", self.on_version_selected)
-        self.load_versions()  # This will populate the dropdown
+        self.version_combo = Gtk.ComboBox()
+        renderer = Gtk.CellRendererText()
+        self.version_combo.pack_start(renderer, True)
+        self.version_combo.add_attribute(renderer, "text", 1)
+        self.version_changed_handler = self.version_combo.connect("changed", self.on_version_selected)
+        self._show_version_placeholder("Loading versions...")  # load_config fills it in
 
         hbox_version = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=10)
         hbox_version.pack_start(version_label, False, False, 0)
         hbox_version.pack_start(self.version_combo, True, True, 0)
         vbox.pack_start(hbox_version, False, False, 0)
 
+        # Instances share the downloaded files but each gets its own game directory
+        # (saves, mods, options). Type a new name to create one.
+        instance_label = Gtk.Label(label="Instance:")
+        self.instance_combo = Gtk.ComboBoxText.new_with_entry()
+        self.instance_combo.append_text(pipeline.DEFAULT_INSTANCE)
+        self.instance_combo.set_active(0)
+
+        hbox_instance = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=10)
+        hbox_instance.pack_start(instance_label, False, False, 0)
+        hbox_instance.pack_start(self.instance_combo, True, True, 0)
+        vbox.pack_start(hbox_instance, False, False, 0)
+
         # The big red button that launches Minecraft
         launch_button = Gtk.Button(label="Launch Game")
         launch_button.connect("clicked", self.on_launch_game_clicked)
         vbox.pack_start(launch_button, False, False, 0)
 
+        # Rehash everything and re-download only what's broken
+        verify_button = Gtk.Button(label="Verify Installation")
+        verify_button.connect("clicked", self.on_verify_clicked)
+        vbox.pack_start(verify_button, False, False, 0)
+
+        # Download progress for whatever the worker is currently doing
+        self.progress_bar = Gtk.ProgressBar()
+        self.progress_bar.set_show_text(True)
+        self.progress_bar.set_text("Idle")
+        vbox.pack_start(self.progress_bar, False, False, 0)
+
+        hbox_progress = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=10)
+        self.queue_label = Gtk.Label(label="")
+        self.queue_label.set_xalign(0)
+        hbox_progress.pack_start(self.queue_label, True, True, 0)
+        self.cancel_button = Gtk.Button(label="Cancel")
+        self.cancel_button.set_sensitive(False)
+        self.cancel_button.connect("clicked", self.on_cancel_clicked)
+        hbox_progress.pack_start(self.cancel_button, False, False, 0)
+        vbox.pack_start(hbox_progress, False, False, 0)
+
+        return vbox
+
+    def create_instances_page(self):
+        vbox = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=10)
+        vbox.set_margin_top(20)
+        vbox.set_margin_bottom(20)
+        vbox.set_margin_start(20)
+        vbox.set_margin_end(20)
+
+        # One row per game we started: id, name, version, pid, status, cpu, rss, peak rss, first log
+        self.instance_store = Gtk.ListStore(int, str, str, int, str, str, str, str, str)
+        self.instance_view = Gtk.TreeView(model=self.instance_store)
+        for column_id, title in enumerate(["Instance", "Version", "PID", "Status", "CPU", "Memory", "Peak", "First log"], start=1):
+            renderer = Gtk.CellRendererText()
+            column = Gtk.TreeViewColumn(title, renderer, text=column_id)
+            column.set_resizable(True)
+            self.instance_view.append_column(column)
+        self.instance_view.get_selection().connect("changed", lambda selection: self._refresh_instance_log())
+
+        scrolled_list = Gtk.ScrolledWindow()
+        scrolled_list.set_min_content_height(150)
+        scrolled_list.add(self.instance_view)
+        vbox.pack_start(scrolled_list, False, True, 0)
+
+        # Tail of the selected game's stdout/stderr
+        self.instance_log_view = Gtk.TextView()
+        self.instance_log_view.set_editable(False)
+        self.instance_log_view.set_monospace(True)
+        scrolled_log = Gtk.ScrolledWindow()
+        scrolled_log.set_vexpand(True)
+        scrolled_log.add(self.instance_log_view)
+        vbox.pack_start(scrolled_log, True, True, 0)
+
+        hbox_actions = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=10)
+        stop_button = Gtk.Button(label="Stop Game")
+        stop_button.connect("clicked", self.on_stop_instance_clicked)
+        hbox_actions.pack_start(stop_button, True, True, 0)
+        clear_button = Gtk.Button(label="Clear Finished")
+        clear_button.connect("clicked", self.on_clear_instances_clicked)
+        hbox_actions.pack_start(clear_button, True, True, 0)
+        vbox.pack_start(hbox_actions, False, False, 0)
+
+        # The supervisor collects in the background, we just look at it once a second
+        GLib.timeout_add_seconds(1, self._refresh_instances)
         return vbox
 
-    def _download_version_files(self, version_id):
-        self.show_notification("Info", f"Downloading Minecraft version {version_id}...")
-        logging.info(f"Downloading Minecraft version {version_id} using minecraft-launcher-lib...")
-        try:
-            # Let the minecraft-launcher-lib handle all the heavy lifting
-            mll.install.install_minecraft_version(version_id, self.mll_data_dir, callback=DownloadProgressCallback())
-            self.show_notification("Success", f"Minecraft version {version_id} downloaded successfully.")
-            logging.info(f"Successfully downloaded Minecraft {version_id} using minecraft-launcher-lib.")
-        except Exception as e:
-            self.show_notification("Error", f"Failed to download Minecraft {version_id}: {e}")
-            logging.exception(f"Error downloading Minecraft {version_id} using minecraft-launcher-lib: {e}")
+    def _selected_instance_id(self):
+        model, treeiter = self.instance_view.get_selection().get_selected()
+        return model[treeiter][0] if treeiter else None
+
+    def _refresh_instances(self):
+        for instance in self.supervisor.list():
+            sample = instance.latest_sample()
+            if instance.running:
+                status = "Running"
+            else:
+                status = f"Exited ({instance.exit_code})"
+            first_log = instance.time_to_first_log
+            row = [
+                instance.id,
+                instance.name,
+                instance.version_id or "",
+                instance.pid,
+                status,
+                f"{sample[1]:.0f}%" if sample and instance.running else "",
+                f"{sample[2] / (1024 * 1024):.0f} MiB" if sample and instance.running else "",
+                f"{instance.peak_rss / (1024 * 1024):.0f} MiB" if instance.peak_rss else "",
+                f"{first_log:.2f}s" if first_log is not None else ""
+            ]
+            treeiter = self.instance_rows.get(instance.id)
+            if treeiter is None:
+                self.instance_rows[instance.id] = self.instance_store.append(row)
+            else:
+                self.instance_store.set_row(treeiter, row)
+        self._refresh_instance_log()
+        return True  # Keep the timer going
+
+    def _refresh_instance_log(self):
+        instance = self.supervisor.get(self._selected_instance_id())
+        if instance is None:
+            if self.shown_log[0] is not None:
+                self.instance_log_view.get_buffer().set_text("")
+                self.shown_log = (None, 0)
+            return
+        # Only touch the buffer when there's actually something new
+        if self.shown_log == (instance.id, instance.lines_seen):
+            return
+        self.shown_log = (instance.id, instance.lines_seen)
+        buffer = self.instance_log_view.get_buffer()
+        buffer.set_text(instance.log_text())
+        self.instance_log_view.scroll_to_mark(buffer.get_insert(), 0, False, 0, 0)
+
+    def on_stop_instance_clicked(self, button):
+        instance_id = self._selected_instance_id()
+        if instance_id is not None:
+            self.supervisor.stop(instance_id)
+
+    def on_clear_instances_clicked(self, button):
+        self.supervisor.forget_finished()
+        for instance_id in list(self.instance_rows):
+            if self.supervisor.get(instance_id) is None:
+                self.instance_store.remove(self.instance_rows.pop(instance_id))
 
     def show_notification(self, title, message):
+        # Non-modal on purpose: dialog.run() spins a nested main loop and blocks
+        # whoever called us until the user clicks OK
         dialog = Gtk.MessageDialog(
             parent=self.window,
-            modal=True,
+            modal=False,
             message_type=Gtk.MessageType.INFO,
             buttons=Gtk.ButtonsType.OK,
             text=message
         )
         dialog.set_title(title)
-        dialog.run()
-        dialog.destroy()
+        dialog.connect("response", lambda d, response: d.destroy())
+        dialog.show()
+
+    def _update_task_widgets(self):
+        running = self.task_runner.current is not None
+        queued = self.task_runner.pending_count()
+        self.cancel_button.set_sensitive(running or queued > 0)
+        self.queue_label.set_text(f"{queued} launch(es) queued" if queued else "")
+        if not running and not queued:
+            self.progress_bar.set_fraction(0)
+            self.progress_bar.set_text("Idle")
+
+    def on_task_progress(self, task, status, current, total):
+        if status:
+            if task.metrics and task.metrics.files_total and total:
+                status = f"{status} ({task.metrics.describe()})"
+            self.progress_bar.set_text(status)
+        if total:
+            self.progress_bar.set_fraction(min(current / total, 1.0))
+        else:
+            self.progress_bar.pulse()
+        self._update_task_widgets()
+
+    def on_task_done(self, task, process):
+        logging.info(f"{task.name} finished, game running with pid {process.pid}")
+        self.show_notification("Launching Game", f"{task.name}...")
+        self._update_task_widgets()
+
+    def on_task_error(self, task, error):
+        if isinstance(error, CancelledError):
+            self.progress_bar.set_text("Cancelled")
+        else:
+            self.show_notification("Error", f"{task.name} failed: {error}")
+        self._update_task_widgets()
+
+    def on_verify_done(self, task, bad):
+        if bad:
+            self.show_notification("Verify Installation", f"{task.name}: repaired {len(bad)} broken file(s).")
+        else:
+            self.show_notification("Verify Installation", f"{task.name}: everything checks out.")
+        self._update_task_widgets()
+
+    def on_verify_clicked(self, button):
+        version_id = self._active_version_id()
+        if not version_id:
+            self.show_notification("Error", "Please select a Minecraft version first.")
+            return
+        minecraft_dir = self.mll_data_dir
+        data_dir = self.data_dir
+        config = self.config.to_dict()
+        self.task_runner.submit(
+            f"Verify {version_id}",
+            lambda task: pipeline.verify_version(version_id, minecraft_dir, task, config, data_dir),
+            on_progress=self.on_task_progress,
+            on_done=self.on_verify_done,
+            on_error=self.on_task_error
+        )
+        self._update_task_widgets()
+
+    def on_cancel_clicked(self, button):
+        self.task_runner.cancel_all()
 
     def load_versions(self):
-        # Clear the dropdown and show loading message
-        self.version_combo.remove_all()
-        self.version_combo.append_text("Loading versions...")
-        self.version_combo.set_active(0)
-
-        try:
-            # Get all available versions from Mojang's servers
-            raw_versions = mll.utils.get_available_versions(self.mll_data_dir)
-            logging.info(f"Found {len(raw_versions)} raw versions.")
-            # Sort by release date so newest versions appear first
-            self.versions = {entry["id"]: entry for entry in sorted(raw_versions, key=lambda x: x.get("releaseTime", ""), reverse=True)}
-            logging.info(f"Processed {len(self.versions)} unique versions.")
-
-            # Populate the dropdown with all versions
-            for version_id in self.versions:
-                self.version_combo.append_text(version_id)
-
-            # Remove the "Loading..." placeholder
-            self.version_combo.remove(0)
-
-            # Try to restore the previously selected version
-            if self.selected_version_id and self.selected_version_id in self.versions:
-                index = 0
-                for i, version_id in enumerate(self.versions):
-                    if version_id == self.selected_version_id:
-                        index = i
-                        break
-                self.version_combo.set_active(index)
-                logging.info(f"Pre-selected version from config: {self.selected_version_id}")
-            elif self.versions:
-                # Default to the first (newest) version
-                self.version_combo.set_active(0)
-                self.selected_version_id = self.version_combo.get_active_text()
-                logging.info(f"No config selection, setting active version to: {self.selected_version_id}")
+        # Show whatever we cached last time right away - the network refresh
+        # happens in the background and only touches the UI if something changed
+        with tracing.span("load_versions"):
+            cached = self.manifest_cache.cached_versions()
+            if cached is not None:
+                self._populate_versions(cached)
             else:
-                # No versions found at all
-                self.version_combo.append_text("No versions found")
-                self.version_combo.set_active(0)
-                self.selected_version_id = None
-                logging.info("No versions found to display.")
-
-        except Exception as e:
-            logging.exception(f"Error loading versions using minecraft-launcher-lib: {e}")
-            self.show_notification("Error", f"Failed to load Minecraft versions: {e}")
-            self.version_combo.remove_all()
-            self.version_combo.append_text("Error loading versions")
+                # First run, nothing cached yet
+                self._show_version_placeholder("Loading versions...")
+
+        self.background_runner.submit(
+            "Refresh version list",
+            self._refresh_versions,
+            on_done=self.on_versions_refreshed,
+            on_error=self.on_versions_refresh_failed
+        )
+
+    def _refresh_versions(self, task):
+        with tracing.span("refresh_manifest", url=self.manifest_cache.url):
+            return self.manifest_cache.refresh()
+
+    def _show_version_placeholder(self, text):
+        store = Gtk.ListStore(str, str)
+        store.append(["", text])
+        with self.version_combo.handler_block(self.version_changed_handler):
+            self.version_combo.set_model(store)
             self.version_combo.set_active(0)
+
+    def _populate_versions(self, versions):
+        # versions comes pre-sorted (newest first) from the manifest cache
+        self.versions = VersionIndex(with_local_versions(versions, self.mll_data_dir))
+        logging.info(f"Processed {len(self.versions)} unique versions.")
+
+        if not self.versions:
+            # No versions found at all
+            self._show_version_placeholder("No versions found")
             self.selected_version_id = None
+            logging.info("No versions found to display.")
+            return
+
+        if self.selected_version_id not in self.versions:
+            # Default to the first (newest) version
+            self.selected_version_id = self.versions.order[0]
+            logging.info(f"No config selection, setting active version to: {self.selected_version_id}")
+        self._restore_version_selection()
+
+    def _restore_version_selection(self):
+        # Make sure the filter actually shows the selected version, then let the
+        # row loader select it as soon as its row exists
+        version_type = self.versions.type_of(self.selected_version_id)
+        if version_type not in VERSION_TYPE_IDS:
+            version_type = "all"  # Modloader profiles and other oddballs
+        active_filter = self.version_type_combo.get_active_id()
+        if version_type and active_filter != "all" and active_filter != version_type:
+            self.version_type_combo.set_active_id(version_type)  # Rebuilds the rows via on_version_filter_changed
+        else:
+            self._rebuild_version_rows()
+
+    def _rebuild_version_rows(self):
+        if self.version_row_loader:
+            GLib.source_remove(self.version_row_loader)
+            self.version_row_loader = None
+
+        version_type = self.version_type_combo.get_active_id()
+        ids = self.versions.search(self.version_search_entry.get_text(), None if version_type == "all" else version_type)
+        if not ids:
+            self._show_version_placeholder("No matching versions")
+            return
+
+        store = Gtk.ListStore(str, str)
+        self.version_rows = {}
+        with self.version_combo.handler_block(self.version_changed_handler):
+            self.version_combo.set_model(store)
+        # First batch right now so the combo is never empty, the rest while idle
+        if self._append_version_rows(store, ids, 0):
+            self.version_row_loader = GLib.idle_add(self._append_version_rows, store, ids, VERSION_ROW_BATCH)
+
+    def _append_version_rows(self, store, ids, start):
+        if store is not self.version_combo.get_model():
+            return False  # The filter changed under us, this store is dead
+        end = min(start + VERSION_ROW_BATCH, len(ids))
+        for row in range(start, end):
+            store.append([ids[row], ids[row]])
+            self.version_rows[ids[row]] = row
+        if self.version_combo.get_active() < 0 and self.selected_version_id in self.version_rows:
+            with self.version_combo.handler_block(self.version_changed_handler):
+                self.version_combo.set_active(self.version_rows[self.selected_version_id])
+        if end < len(ids):
+            if start:
+                # Called from idle_add: move on to the next batch
+                self.version_row_loader = GLib.idle_add(self._append_version_rows, store, ids, end)
+                return False
+            return True
+        self.version_row_loader = None
+        return False
+
+    def _active_version_id(self):
+        treeiter = self.version_combo.get_active_iter()
+        if treeiter is None:
+            return None
+        return self.version_combo.get_model()[treeiter][0] or None
+
+    def _populate_instances(self):
+        self.instance_combo.remove_all()
+        self.instance_combo.append_text(pipeline.DEFAULT_INSTANCE)
+        for name in self.config.get("instances", []):
+            self.instance_combo.append_text(name)
+        self.instance_combo.get_child().set_text(self.config.get("selected_instance") or pipeline.DEFAULT_INSTANCE)
+
+    def _selected_instance(self):
+        return self.instance_combo.get_child().get_text().strip() or pipeline.DEFAULT_INSTANCE
+
+    def _schedule_prefetch(self, delay):
+        if self.prefetch_timer:
+            GLib.source_remove(self.prefetch_timer)
+        self.prefetch_timer = GLib.timeout_add_seconds(delay, self._start_prefetch)
+
+    def _start_prefetch(self):
+        self.prefetch_timer = None
+        if self.config_loaded:
+            self.prefetcher.prefetch(self.selected_version_id, self.config.to_dict())
+        return False
+
+    def on_version_filter_changed(self, widget):
+        if self.versions:
+            self._rebuild_version_rows()
+
+    def on_versions_refreshed(self, task, result):
+        versions, changed = result
+        if changed or not self.versions:
+            with tracing.span("load_versions", refreshed=True):
+                self._populate_versions(versions)
+
+    def on_versions_refresh_failed(self, task, error):
+        # Only complain if there's no cached list to fall back to
+        if self.versions:
+            return
+        # Offline on a fresh machine: whatever is installed (imported, modded,
+        # ...) can still be launched
+        self._populate_versions([])
+        if self.versions:
+            logging.warning(f"Failed to load Minecraft versions, showing installed ones only: {error}")
+            return
+        self.show_notification("Error", f"Failed to load Minecraft versions: {error}")
+        self._show_version_placeholder("Error loading versions")
+        self.selected_version_id = None
 
     def on_version_selected(self, combo_box):
         old_selected_version_id = self.selected_version_id
-        self.selected_version_id = combo_box.get_active_text()
+        active_version_id = self._active_version_id()
+        if active_version_id is None and old_selected_version_id:
+            return  # Just a placeholder or a filter change, keep the real selection
+        self.selected_version_id = active_version_id
         if self.selected_version_id:
             logging.info(f"Version selected in UI: {self.selected_version_id} (previously {old_selected_version_id})")
         else:
             logging.info(f"No version selected in UI (previously {old_selected_version_id}).")
         self.save_config()
+        if self.selected_version_id != old_selected_version_id:
+            self._schedule_prefetch(PREFETCH_SELECT_DELAY)
 
     def on_add_account_clicked(self, button):
         username = self.username_entry.get_text().strip()
         if username:
             # Don't add duplicate usernames
-            if not any(a.get("username") == username for a in self.config["accounts"]):
-                player_uuid = str(uuid.uuid3(uuid.NAMESPACE_OID, username))
-                self.config["accounts"].append({"username": username, "uuid": player_uuid})
+            if self.config.add_account(username):
                 self.account_list_store.append([username])
                 self.save_config()
             self.username_entry.set_text("")  # Clear the input field
@@ -404,14 +685,14 @@ class MinecraftLauncher(Gtk.Application):
             username_to_delete = model[treeiter][0]
             model.remove(treeiter)
             # Remove from config as well
-            self.config["accounts"] = [a for a in self.config["accounts"] if a.get("username") != username_to_delete]
+            self.config.remove_account(username_to_delete)
             # If this was the selected account, clear the selection
             if self.selected_account == username_to_delete:
                 self.selected_account = None
             self.save_config()
 
     def on_launch_game_clicked(self, button):
-        selected_version_id = self.version_combo.get_active_text()
+        selected_version_id = self._active_version_id()
         if not selected_version_id:
             self.show_notification("Error", "Please select a Minecraft version first.")
             return
@@ -420,57 +701,39 @@ class MinecraftLauncher(Gtk.Application):
             self.show_notification("Error", "Please select an offline account first.")
             return
 
-        self._download_version_files(selected_version_id)
+        instance_name = self._selected_instance()
+        if not pipeline.is_valid_instance_name(instance_name):
+            self.show_notification("Error", f"Invalid instance name: {instance_name}")
+            return
+        if instance_name != pipeline.DEFAULT_INSTANCE and instance_name not in self.config["instances"]:
+            self.config["instances"] = self.config["instances"] + [instance_name]
+            self.instance_combo.append_text(instance_name)
 
         # Find the UUID for the selected account
-        player_uuid = None
-        for account in self.config["accounts"]:
-            if account.get("username") == self.selected_account:
-                player_uuid = account.get("uuid")
-                break
-        if not player_uuid:
-            # Generate a UUID if we somehow don't have one
-            player_uuid = str(uuid.uuid3(uuid.NAMESPACE_OID, self.selected_account))
+        player_uuid = self.config.account_uuid(self.selected_account)
 
         self.save_config()
-        
-        # Generate a random session token (Minecraft needs this even for offline mode)
-        session_token = str(uuid.uuid4())
 
-        # Make sure Java is available
-        java_executable_path = mll.utils.get_java_executable()
-        if not java_executable_path:
-            self.show_notification("Error", "Java executable not found or not correctly configured by minecraft-launcher-lib.")
-            return
-        logging.info(f"Using Java executable: {java_executable_path}")
-
-        # Build the command line arguments for Minecraft
-        options = {
-            "username": self.selected_account,
-            "uuid": player_uuid,
-            "token": session_token, # Random session token for offline mode
-            "auth_type": "offline", # We're not using Mojang authentication
-            "user_type": "legacy", # Legacy user type for offline accounts
-            "sessionid": session_token # Same token for session ID
-        }
-        command = mll.command.get_minecraft_command(
-            version=selected_version_id,
-            minecraft_directory=self.mll_data_dir,
-            options=options
+        # The launch takes it from here - whatever the prefetch already finished
+        # is on disk and gets skipped, the rest goes at full speed
+        self.prefetcher.cancel()
+
+        # Snapshot everything the worker needs now - the user is free to pick
+        # another version or account while this one is still downloading
+        username = self.selected_account
+        minecraft_dir = self.mll_data_dir
+        data_dir = self.data_dir
+        config = self.config.to_dict()
+        game_dir = pipeline.instance_game_dir(data_dir, minecraft_dir, instance_name)
+        self.task_runner.submit(
+            f"Launch {selected_version_id} as {username} ({instance_name})",
+            lambda task: pipeline.install_and_launch(task, selected_version_id, minecraft_dir, username, player_uuid, config,
+                                                     data_dir, game_dir, self.supervisor, f"{instance_name} ({username})"),
+            on_progress=self.on_task_progress,
+            on_done=self.on_task_done,
+            on_error=self.on_task_error
         )
-
-        logging.info("Launching command: %s", " ".join(command))
-        self.show_notification("Launching Game", f"Launching Minecraft {selected_version_id} with account {self.selected_account}...")
-        
-        try:
-            # Actually launch the game
-            subprocess.Popen(command, cwd=self.mll_data_dir)
-        except FileNotFoundError:
-            self.show_notification("Error", "Java executable not found or not correctly configured. Please ensure Java is installed and in your PATH.")
-            logging.exception("Java executable not found during launch.")
-        except Exception as e:
-            self.show_notification("Error", f"Failed to launch Minecraft: {e}")
-            logging.exception(f"Error launching Minecraft: {e}")
+        self._update_task_widgets()
 
 if __name__ == "__main__":
     app = MinecraftLauncher()
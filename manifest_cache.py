@@ -0,0 +1,136 @@
+import json
+import logging
+import os
+import time
+
+from downloader import HttpPool, MANIFEST_URL
+
+DEFAULT_TTL = 60 * 60  # Mojang ships a few snapshots a week, an hour is plenty fresh
+
+
+class ManifestCache:
+    # Keeps Mojang's version manifest on disk next to the config, plus the list
+    # of versions already sorted newest-first, so the UI can show something
+    # immediately and refresh in the background. Revalidation uses ETag /
+    # If-Modified-Since, so most refreshes are a tiny 304. The meta remembers
+    # which URL all of it came from, a cache of another URL (Mojang's before a
+    # mirror was set up, say) is stale and its validators aren't sent.
+    def __init__(self, data_dir, url=MANIFEST_URL, ttl=DEFAULT_TTL):
+        self.url = url
+        self.ttl = ttl
+        self.cache_dir = os.path.join(data_dir, "cache")
+        self.manifest_file = os.path.join(self.cache_dir, "version_manifest.json")
+        self.meta_file = os.path.join(self.cache_dir, "version_manifest.meta.json")
+        self.sorted_file = os.path.join(self.cache_dir, "versions_sorted.json")
+
+    def _read_json(self, path):
+        try:
+            with open(path, "r") as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+
+    def _write_json(self, path, data):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        temp_path = path + ".tmp"
+        with open(temp_path, "w") as f:
+            json.dump(data, f)
+        os.replace(temp_path, path)
+
+    def meta(self):
+        meta = self._read_json(self.meta_file) or {}
+        return meta if meta.get("url") == self.url else {}
+
+    def is_fresh(self):
+        return time.time() - self.meta().get("fetched_at", 0) < self.ttl
+
+    def cached_manifest(self):
+        return self._read_json(self.manifest_file)
+
+    def cached_versions(self):
+        # Already sorted when it was written, so this is just a json.load
+        return self._read_json(self.sorted_file)
+
+    def _store(self, manifest, meta):
+        versions = sorted(manifest.get("versions", []), key=lambda x: x.get("releaseTime", ""), reverse=True)
+        # Only keep what the UI needs, the full manifest is cached separately
+        versions = [{key: entry.get(key) for key in ("id", "type", "releaseTime")} for entry in versions]
+        self._write_json(self.manifest_file, manifest)
+        self._write_json(self.sorted_file, versions)
+        self._write_json(self.meta_file, meta)
+        return versions
+
+    def seed(self, manifest):
+        # A version list from elsewhere (a mirror pack) for when we have none of
+        # our own yet. Stale and without validators, so the first refresh that
+        # gets through replaces it. Returns whether it was used
+        if self.cached_versions() is not None and self.meta():
+            return False
+        self._store(manifest, {"url": self.url})
+        return True
+
+    def refresh(self, force=False):
+        # Returns (versions, changed). Falls back to the cache when offline and only
+        # raises if there is nothing cached to fall back to.
+        cached = self.cached_versions()
+        if cached is not None and not force and self.is_fresh():
+            return cached, False
+
+        meta = self.meta()
+        headers = {}
+        if cached is not None:
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+
+        pool = HttpPool(per_host=1)
+        body = []
+        try:
+            response = pool.request(self.url, body.append, headers=headers)
+        except Exception as e:
+            if cached is None:
+                raise
+            logging.warning(f"Could not refresh version manifest, using cached copy: {e}")
+            return cached, False
+        finally:
+            pool.close()
+
+        meta["url"] = self.url
+        meta["fetched_at"] = time.time()
+        if response.status == 304:
+            logging.info("Version manifest not modified since last fetch.")
+            self._write_json(self.meta_file, meta)
+            return cached, False
+
+        manifest = json.loads(b"".join(body))
+        meta["etag"] = response.getheader("ETag")
+        meta["last_modified"] = response.getheader("Last-Modified")
+        versions = self._store(manifest, meta)
+        logging.info(f"Fetched version manifest with {len(versions)} versions.")
+        return versions, versions != cached
+
+
+def with_local_versions(versions, minecraft_dir):
+    # mll.utils.get_available_versions used to mix in locally installed profiles
+    # (Fabric, Forge, ...) - keep doing that, newest first like everything else
+    known = {entry["id"] for entry in versions}
+    local = []
+    versions_dir = os.path.join(minecraft_dir, "versions")
+    try:
+        names = os.listdir(versions_dir)
+    except OSError:
+        return versions
+    for name in names:
+        if name in known:
+            continue
+        path = os.path.join(versions_dir, name, f"{name}.json")
+        try:
+            with open(path, "r") as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            continue
+        local.append({"id": name, "type": data.get("type", "custom"), "releaseTime": data.get("releaseTime", "")})
+    if not local:
+        return versions
+    return sorted(versions + local, key=lambda x: x.get("releaseTime", ""), reverse=True)
@@ -0,0 +1,244 @@
+import hashlib
+import io
+import json
+import logging
+import os
+import sys
+import tarfile
+import time
+
+from downloader import MANIFEST_URL, Downloader, sha1_of_file
+from install_index import InstallIndex
+from launch_plan import LaunchPlanCache
+from manifest_cache import ManifestCache
+
+PACK_FORMAT = 1
+INDEX_NAME = "mirror.json"
+MANIFEST_NAME = "version_manifest_v2.json"
+COPY_CHUNK = 1024 * 1024
+
+# A mirror pack is a tar stream laid out exactly like minecraft_dir, plus a
+# version manifest at the top and mirror.json (always the first member) that
+# lists every file with its SHA1. So the same pack can be imported straight into
+# a game directory, or unpacked anywhere and served (python -m http.server
+# does fine) as the "mirror" of other machines.
+
+
+class MirrorError(Exception):
+    pass
+
+
+def _compression(path):
+    if path.endswith((".tar.xz", ".txz")):
+        return "xz"
+    if path.endswith((".tar.bz2", ".tbz2")):
+        return "bz2"
+    if path.endswith(".tar"):
+        return ""
+    return "gz"  # Most of the bulk (sounds, textures) is compressed already, gzip is plenty
+
+
+def _version_chain(minecraft_dir, version_id):
+    # [(id, version JSON)], version_id first - from disk only, an export never
+    # downloads anything
+    chain = []
+    while version_id and version_id not in [chain_id for chain_id, data in chain]:
+        path = os.path.join(minecraft_dir, "versions", version_id, f"{version_id}.json")
+        try:
+            with open(path, "r") as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            raise MirrorError(f"{version_id} is not installed") from None
+        chain.append((version_id, data))
+        version_id = data.get("inheritsFrom")
+    return chain
+
+
+def pack_contents(version_ids, minecraft_dir, data_dir):
+    # ({arcname: (path, sha1)}, {version id: [arcnames]}, manifest) for an export.
+    # Only looks at what's on disk - versions have to be installed first
+    manifest = ManifestCache(data_dir).cached_manifest() or {"latest": {}, "versions": []}
+    downloader = Downloader(minecraft_dir)
+    files = {}
+    versions = {}
+    listed = {entry["id"] for entry in manifest.get("versions", [])}
+    try:
+        for version_id in version_ids:
+            names = []
+            items = []
+            for chain_id, data in _version_chain(minecraft_dir, version_id):
+                # Version JSON, jar and extracted natives - everything under versions/<id>
+                version_dir = os.path.join(minecraft_dir, "versions", chain_id)
+                for root, dirs, filenames in os.walk(version_dir):
+                    for filename in filenames:
+                        if filename.endswith((".part", ".tmp")):
+                            continue
+                        path = os.path.join(root, filename)
+                        names.append(os.path.relpath(path, minecraft_dir))
+                        files.setdefault(names[-1], (path, None))
+                if chain_id not in listed:
+                    # Modloader profiles aren't in Mojang's manifest, the mirror's has them
+                    manifest["versions"].append({
+                        "id": chain_id,
+                        "type": data.get("type", "custom"),
+                        "url": f"versions/{chain_id}/{chain_id}.json",
+                        "releaseTime": data.get("releaseTime", ""),
+                        "time": data.get("time", "")
+                    })
+                    listed.add(chain_id)
+                items.extend(downloader.collect_items(data)[0])
+                index_item = downloader.asset_index_item(data)
+                if index_item:
+                    if not os.path.isfile(index_item.path):
+                        raise MirrorError(f"{version_id} is not fully installed ({index_item.path} is missing), "
+                                          f"install it first")
+                    items.append(index_item)
+                    items.extend(downloader.asset_object_items(index_item.path))
+            for item in items:
+                if not os.path.isfile(item.path):
+                    raise MirrorError(f"{version_id} is not fully installed ({item.path} is missing), install it first")
+                name = os.path.relpath(item.path, minecraft_dir)
+                names.append(name)
+                if files.get(name, (None, None))[1] is None:
+                    files[name] = (item.path, item.sha1)
+            versions[version_id] = sorted(set(names))
+    finally:
+        downloader.close()
+    return files, versions, manifest
+
+
+def _add_bytes(tar, name, data):
+    info = tarfile.TarInfo(name)
+    info.size = len(data)
+    info.mtime = int(time.time())
+    tar.addfile(info, io.BytesIO(data))
+
+
+def export_pack(version_ids, minecraft_dir, data_dir, output, task=None):
+    # output is a path, or "-" for stdout (export-pack ... - | ssh lab import-pack -)
+    start = time.monotonic()
+    files, versions, manifest = pack_contents(version_ids, minecraft_dir, data_dir)
+    # Files that don't come with a SHA1 (version JSONs, extracted natives) get one
+    # now, so the import can skip them by hash like everything else
+    index = {name: sha1 or sha1_of_file(path) for name, (path, sha1) in files.items()}
+
+    fileobj = sys.stdout.buffer if output == "-" else open(output + ".tmp", "wb")
+    total = len(files)
+    total_bytes = 0
+    try:
+        with tarfile.open(fileobj=fileobj, mode=f"w|{_compression(output)}") as tar:
+            _add_bytes(tar, INDEX_NAME, json.dumps({
+                "format": PACK_FORMAT,
+                "created": time.time(),
+                "versions": versions,
+                "files": index
+            }).encode())
+            _add_bytes(tar, MANIFEST_NAME, json.dumps(manifest).encode())
+            for done, name in enumerate(sorted(files), 1):
+                path = files[name][0]
+                tar.add(path, arcname=name.replace(os.sep, "/"), recursive=False)
+                total_bytes += os.path.getsize(path)
+                if task:
+                    task.report(f"Exporting {', '.join(version_ids)}", done, total)
+        if output != "-":
+            fileobj.close()
+            os.replace(output + ".tmp", output)
+    except BaseException:
+        if output != "-":
+            fileobj.close()
+            if os.path.exists(output + ".tmp"):
+                os.remove(output + ".tmp")
+        raise
+    logging.info(f"Exported {', '.join(version_ids)}: {total} files, {total_bytes} bytes "
+                 f"in {time.monotonic() - start:.2f}s")
+    return total
+
+
+def _safe_target(minecraft_dir, name):
+    normalized = os.path.normpath(name)
+    if os.path.isabs(normalized) or normalized == ".." or normalized.startswith(".." + os.sep):
+        raise MirrorError(f"Refusing to import {name}, it points outside the game directory")
+    return os.path.join(minecraft_dir, normalized)
+
+
+def _already_there(path, size, sha1):
+    try:
+        if os.path.getsize(path) != size:
+            return False
+    except OSError:
+        return False
+    return sha1_of_file(path) == sha1
+
+
+def import_pack(source, minecraft_dir, data_dir, store=None, task=None, manifest_url=MANIFEST_URL):
+    # Streams the pack (path, or "-" for stdin) straight into minecraft_dir.
+    # Files already present with the right hash (or available from the object
+    # store) are skipped, everything written is checked against its SHA1 first.
+    # The pack's version manifest stands in for manifest_url's until that is
+    # reachable, so an offline machine still gets a version list.
+    start = time.monotonic()
+    fileobj = sys.stdin.buffer if source == "-" else open(source, "rb")
+    written = skipped = linked = 0
+    manifest = None
+    written_bytes = 0
+    try:
+        with tarfile.open(fileobj=fileobj, mode="r|*") as tar:
+            first = tar.next()
+            if first is None or first.name != INDEX_NAME:
+                raise MirrorError(f"{source} is not a mirror pack")
+            pack = json.load(tar.extractfile(first))
+            if pack.get("format") != PACK_FORMAT:
+                raise MirrorError(f"Unsupported mirror pack format {pack.get('format')}")
+            index = pack["files"]
+            total = len(index)
+
+            for member in tar:
+                if member.isfile() and member.name == MANIFEST_NAME:
+                    manifest = json.load(tar.extractfile(member))
+                    continue
+                if not member.isfile() or member.name == INDEX_NAME:
+                    continue
+                target = _safe_target(minecraft_dir, member.name)
+                sha1 = index.get(member.name)
+                if task:
+                    task.report("Importing mirror pack", written + skipped + linked, total)
+                if sha1 and _already_there(target, member.size, sha1):
+                    skipped += 1
+                    continue  # The tar stream just reads past the data
+                if sha1 and store and store.materialize(sha1, target):
+                    linked += 1
+                    continue
+
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                temp_path = f"{target}.import.tmp"
+                digest = hashlib.sha1()
+                try:
+                    with tar.extractfile(member) as src, open(temp_path, "wb") as dst:
+                        for chunk in iter(lambda: src.read(COPY_CHUNK), b""):
+                            digest.update(chunk)
+                            dst.write(chunk)
+                    if sha1 and digest.hexdigest() != sha1:
+                        raise MirrorError(f"SHA1 mismatch for {member.name} in {source}")
+                    os.replace(temp_path, target)
+                finally:
+                    if os.path.exists(temp_path):
+                        os.remove(temp_path)
+                if store and sha1:
+                    store.add(target, sha1)
+                written += 1
+                written_bytes += member.size
+    finally:
+        if source != "-":
+            fileobj.close()
+
+    # Everything was just hashed on the way in, so the next launch can trust it
+    install_index = InstallIndex(data_dir, minecraft_dir)
+    plans = LaunchPlanCache(data_dir)
+    for version_id, names in pack["versions"].items():
+        install_index.save(version_id, [(os.path.join(minecraft_dir, name), index.get(name)) for name in names])
+        plans.invalidate(version_id)
+    if manifest is not None and ManifestCache(data_dir, manifest_url).seed(manifest):
+        logging.info(f"Using the pack's version manifest until {manifest_url} can be reached.")
+    logging.info(f"Imported {', '.join(pack['versions'])}: {written} files written ({written_bytes} bytes), "
+                 f"{linked} linked from the store, {skipped} already present, in {time.monotonic() - start:.2f}s")
+    return written, linked, skipped
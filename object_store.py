@@ -0,0 +1,110 @@
+import errno
+import fcntl
+import logging
+import os
+import shutil
+import threading
+
+FICLONE = 0x40049409  # From linux/fs.h - copy-on-write clone on btrfs/xfs
+
+
+def _reflink(src, dst):
+    with open(src, "rb") as s, open(dst, "wb") as d:
+        fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+
+
+class ObjectStore:
+    # Content-addressed pool of libraries, jars and asset objects, keyed by SHA1
+    # (store/ab/abcdef...). Game directories get hardlinks into it (or reflinks,
+    # or plain copies as a last resort), so every data dir and instance on the
+    # machine shares a single copy of each file.
+    def __init__(self, root):
+        self.root = root
+
+    def path_for(self, sha1):
+        return os.path.join(self.root, sha1[:2], sha1)
+
+    def has(self, sha1):
+        return os.path.isfile(self.path_for(sha1))
+
+    def _link(self, src, dst):
+        # Hardlink first, then reflink, then copy. Each step falls back when the
+        # filesystem can't do it (different device, no CoW support, ...)
+        try:
+            os.link(src, dst)
+            return "link"
+        except OSError as e:
+            if e.errno not in (errno.EXDEV, errno.EPERM, errno.EMLINK, errno.ENOTSUP, errno.EACCES):
+                raise
+        try:
+            _reflink(src, dst)
+            return "reflink"
+        except OSError:
+            pass
+        shutil.copyfile(src, dst)
+        return "copy"
+
+    def materialize(self, sha1, dest):
+        # Puts the stored object at dest. Returns False if we don't have it.
+        src = self.path_for(sha1)
+        if not os.path.isfile(src):
+            return False
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        temp_path = f"{dest}.{threading.get_ident()}.store.tmp"
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        self._link(src, temp_path)
+        os.replace(temp_path, dest)
+        return True
+
+    def add(self, path, sha1):
+        # Adopt a freshly downloaded (and already verified) file into the store
+        dest = self.path_for(sha1)
+        if os.path.isfile(dest):
+            return
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        temp_path = f"{dest}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            self._link(path, temp_path)
+            os.replace(temp_path, dest)
+        except OSError as e:
+            # A read-only or full shared store shouldn't break the install itself
+            logging.warning(f"Could not add {sha1} to the object store: {e}")
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def dedupe(self, path, sha1):
+        # For a verified file that's already in place: adopt it if the store
+        # doesn't have it yet, otherwise swap it for a hardlink to the stored
+        # copy. Only hardlinks - a reflink or copy over identical bytes saves
+        # nothing, and there'd be no telling it already happened next time
+        src = self.path_for(sha1)
+        if not os.path.isfile(src):
+            self.add(path, sha1)
+            return
+        if self.is_shared(path, sha1):
+            return
+        temp_path = f"{path}.{threading.get_ident()}.store.tmp"
+        try:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            os.link(src, temp_path)
+            os.replace(temp_path, path)
+        except OSError as e:
+            # Another device, a store we may not link to, ... - the copy stays
+            logging.debug(f"Could not link {path} to the object store: {e}")
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def discard(self, sha1):
+        try:
+            os.remove(self.path_for(sha1))
+        except FileNotFoundError:
+            pass
+
+    def is_shared(self, path, sha1):
+        # True if path already is (a hardlink to) the stored object
+        try:
+            return os.path.samefile(path, self.path_for(sha1))
+        except OSError:
+            return False
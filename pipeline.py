@@ -0,0 +1,295 @@
+import contextlib
+import logging
+import os
+import re
+import subprocess
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from download_journal import DownloadJournal
+from downloader import Downloader
+from install_index import InstallIndex
+from jvm import jvm_arguments
+from launch_plan import LaunchPlanCache
+from manifest_cache import ManifestCache
+from object_store import ObjectStore
+from runtimes import RuntimeIndex, required_java
+import tracing
+from config_store import ConfigStore, default_data_dir, offline_uuid
+
+DEFAULT_INSTANCE = "default"
+
+
+class LaunchError(Exception):
+    pass
+
+
+class DownloadProgressCallback:
+    def __init__(self, task=None, quiet=False):
+        # Just keeping track of download progress - nothing fancy here.
+        # If we're running inside a worker task, progress gets forwarded to it
+        # (which is also how Cancel reaches into minecraft-launcher-lib).
+        # Quiet ones only check for Cancel, for when something else owns the progress bar
+        self.task = task
+        self.quiet = quiet
+        self.total = 0
+        self.current = 0
+        self.status = ""
+
+    def set_max(self, max_value):
+        self.total = max_value
+        logging.debug(f"Download Max Set: {self.total}")
+        self._forward()
+
+    def set_progress(self, progress):
+        self.current = progress
+        # Called for every file - no logging here, Task.report takes care of throttling
+        self._forward()
+
+    def set_status(self, status):
+        self.status = status
+        logging.debug(f"Download Status: {self.status}")
+        self._forward()
+
+    def _forward(self):
+        if not self.task:
+            return
+        if self.quiet:
+            self.task.token.raise_if_cancelled()
+        else:
+            self.task.report(self.status, self.current, self.total)
+
+    def get(self, key, default=None):
+        # This is basically a callback dispatcher for the minecraft-launcher-lib
+        # They expect certain method names, so we're just routing them
+        if key == "setStatus":
+            return self.set_status
+        elif key == "setMax":
+            return self.set_max
+        elif key == "setProgress":
+            return self.set_progress
+        return default
+
+
+def read_config(data_dir):
+    # Read-only peek at config.json for anything that runs without the GUI
+    store = ConfigStore(os.path.join(data_dir, "config.json"))
+    store.load()
+    return store.to_dict()
+
+
+def object_store_for(data_dir, config):
+    # Point "object_store" at a shared path to dedupe across users on one machine
+    return ObjectStore((config or {}).get("object_store") or os.path.join(data_dir, "store"))
+
+
+def is_valid_instance_name(name):
+    return bool(re.fullmatch(r"[\w.\- ]+", name)) and name not in (".", "..")
+
+
+def instance_game_dir(data_dir, minecraft_dir, name):
+    # The default instance keeps playing out of the shared directory like it always
+    # has (so existing saves stay put), everything else gets its own game dir
+    if not name or name == DEFAULT_INSTANCE:
+        return minecraft_dir
+    if not is_valid_instance_name(name):
+        raise LaunchError(f"Invalid instance name: {name}")
+    return os.path.join(data_dir, "instances", name)
+
+
+def _install_managed_runtime(component, minecraft_dir, task=None, quiet=False, stats=None):
+    # minecraft-launcher-lib is only imported on the paths that actually need it
+    import minecraft_launcher_lib as mll
+    start = time.monotonic()
+    with stats.timed("runtime") if stats else contextlib.nullcontext():
+        mll.runtime.install_jvm_runtime(component, minecraft_dir, callback=DownloadProgressCallback(task, quiet))
+    logging.info(f"Installed Java runtime {component} in {time.monotonic() - start:.2f}s.")
+
+
+def _needs_managed_runtime(requirement, minecraft_dir, data_dir, config):
+    # "java_runtime" in the config: "auto" (default) uses any installed Java that
+    # fits and only downloads Mojang's runtime when none does, "managed" always
+    # uses Mojang's, anything else is the path to a java binary to use as-is
+    if not requirement or not requirement.get("component"):
+        return False
+    setting = (config or {}).get("java_runtime") or "auto"
+    if setting not in ("auto", "managed"):
+        return False
+    return RuntimeIndex(data_dir, minecraft_dir).select(requirement, managed_only=setting == "managed") is None
+
+
+def select_java(version_id, minecraft_dir, data_dir=None, config=None):
+    # The java binary (and its major version) this version will run on
+    setting = (config or {}).get("java_runtime") or "auto"
+    index = RuntimeIndex(data_dir or minecraft_dir, minecraft_dir)
+    if setting not in ("auto", "managed"):
+        java = index.lookup(setting)
+        if not java:
+            raise LaunchError(f"The configured java_runtime {setting} doesn't run.")
+        return java
+    return index.select(required_java(version_id, minecraft_dir), managed_only=setting == "managed")
+
+
+def install_version(version_id, minecraft_dir, task=None, config=None, data_dir=None, verify=False, runtime=True):
+    index = InstallIndex(data_dir or minecraft_dir, minecraft_dir)
+
+    # Warm launch: a stat() per file and we're done. The expensive rehash only
+    # happens when asked for, or when the index hasn't been verified in a while
+    if index.is_installed(version_id):
+        if not verify and not index.is_stale(version_id):
+            logging.info(f"Minecraft {version_id} is already installed, skipping download.")
+            return
+        if task:
+            task.report(f"Verifying {version_id}")
+        bad = index.rehash(version_id)
+        if not bad:
+            logging.info(f"Minecraft {version_id} verified, skipping download.")
+            return
+        logging.warning(f"{len(bad)} file(s) of {version_id} failed verification, reinstalling.")
+
+    logging.info(f"Downloading Minecraft version {version_id}...")
+    # Our own parallel downloader does the game files, mll still takes care of
+    # the Java runtime Mojang wants for this version
+    downloader = Downloader.from_config(minecraft_dir, config or {}, task=task,
+                                        known_files=index.known_files(version_id),
+                                        manifest=ManifestCache(data_dir or minecraft_dir).cached_manifest(),
+                                        store=object_store_for(data_dir or minecraft_dir, config),
+                                        journal=DownloadJournal.for_data_dir(data_dir or minecraft_dir))
+    runtime_pool = ThreadPoolExecutor(max_workers=1)
+    try:
+        # Find out which Java this needs before the big download starts, so
+        # Mojang's runtime (if no installed Java fits) downloads alongside the
+        # game files instead of after them
+        requirement = None
+        resolving = version_id
+        while resolving and not requirement:
+            resolved = downloader.resolve_version(resolving)
+            requirement = resolved.get("javaVersion")
+            resolving = resolved.get("inheritsFrom")
+        runtime_install = None
+        # runtime=False (the prefetch) leaves Mojang's Java to the launch - mll
+        # fetches it at full speed, no matter what download_rate_limit says
+        if runtime and _needs_managed_runtime(requirement, minecraft_dir, data_dir or minecraft_dir, config):
+            logging.info(f"Installing Java runtime {requirement['component']} alongside {version_id}.")
+            runtime_install = runtime_pool.submit(_install_managed_runtime, requirement["component"],
+                                                  minecraft_dir, task, True, downloader.stats)
+        with tracing.span("download_version_files", version=version_id):
+            downloader.install(version_id)
+    finally:
+        downloader.close()
+        runtime_pool.shutdown(wait=True)
+    if runtime_install:
+        runtime_install.result()
+    logging.info(f"Install summary for {version_id}: {downloader.stats.summary()}")
+    # Only written once everything (runtime included) made it to disk
+    index.save(version_id, [(item.path, item.sha1) for item in downloader.installed_items])
+    # Whatever we had resolved for the old files is no good anymore
+    LaunchPlanCache(data_dir or minecraft_dir).invalidate(version_id)
+    logging.info(f"Successfully downloaded Minecraft {version_id}.")
+
+
+def verify_version(version_id, minecraft_dir, task=None, config=None, data_dir=None, workers=None, repair=True):
+    from verify import Verifier
+
+    downloader = Downloader.from_config(minecraft_dir, config or {}, task=task,
+                                        manifest=ManifestCache(data_dir or minecraft_dir).cached_manifest(),
+                                        store=object_store_for(data_dir or minecraft_dir, config),
+                                        journal=DownloadJournal.for_data_dir(data_dir or minecraft_dir))
+    try:
+        bad = Verifier(minecraft_dir, data_dir, workers=workers, task=task, downloader=downloader).verify(version_id, repair)
+    finally:
+        downloader.close()
+    if bad and repair:
+        LaunchPlanCache(data_dir or minecraft_dir).invalidate(version_id)
+    return bad
+
+
+def _get_minecraft_command(version_id, minecraft_dir, options):
+    import minecraft_launcher_lib as mll
+    with tracing.span("get_minecraft_command", version=version_id):
+        return mll.command.get_minecraft_command(
+            version=version_id,
+            minecraft_directory=minecraft_dir,
+            options=options
+        )
+
+
+def build_launch_command(version_id, minecraft_dir, username, player_uuid=None, data_dir=None, game_dir=None,
+                         config=None, java=None):
+    if not player_uuid:
+        # Generate a UUID if we somehow don't have one
+        player_uuid = offline_uuid(username)
+
+    # Generate a random session token (Minecraft needs this even for offline mode)
+    session_token = str(uuid.uuid4())
+
+    # Make sure the right Java is available - now, rather than when the game
+    # falls over on startup with an UnsupportedClassVersionError
+    java = java or select_java(version_id, minecraft_dir, data_dir, config)
+    if not java:
+        requirement = required_java(version_id, minecraft_dir) or {}
+        raise LaunchError(f"{version_id} needs Java {requirement.get('majorVersion', '8')}, "
+                          f"but no installed Java fits. Found: {RuntimeIndex(data_dir or minecraft_dir, minecraft_dir).describe()}")
+    logging.info(f"Using Java {java['version']} ({java['arch']}): {java['path']}")
+
+    # Build the command line arguments for Minecraft
+    options = {
+        "username": username,
+        "uuid": player_uuid,
+        "token": session_token, # Random session token for offline mode
+        "auth_type": "offline", # We're not using Mojang authentication
+        "user_type": "legacy", # Legacy user type for offline accounts
+        "sessionid": session_token, # Same token for session ID
+        "executablePath": java["path"]
+    }
+    if game_dir and game_dir != minecraft_dir:
+        options["gameDirectory"] = game_dir
+    # Heap, GC and AppCDS picked for this machine (and this version, if overridden)
+    jvm_args = jvm_arguments(version_id, minecraft_dir, data_dir or minecraft_dir, config, java["major"])
+    if jvm_args:
+        options["jvmArguments"] = jvm_args
+    # The expensive part (version JSON parsing, library rules, classpath) is cached
+    # per version, only the account and session bits change between launches
+    plans = LaunchPlanCache(data_dir or minecraft_dir)
+    with tracing.span("launch_plan", version=version_id):
+        return plans.get_command(version_id, minecraft_dir, options, _get_minecraft_command)
+
+
+def start_game(command, cwd, supervisor=None, name=None, version_id=None):
+    logging.info("Launching command: %s", " ".join(command))
+    try:
+        # Actually launch the game - under the supervisor if we have one, so its
+        # output and resource usage show up on the Instances page
+        with tracing.span("Popen", version=version_id):
+            if supervisor:
+                return supervisor.start(command, cwd, name, version_id)
+            return subprocess.Popen(command, cwd=cwd)
+    except FileNotFoundError as e:
+        logging.exception("Java executable not found during launch.")
+        raise LaunchError("Java executable not found or not correctly configured. Please ensure Java is installed and in your PATH.") from e
+
+
+def install_and_launch(task, version_id, minecraft_dir, username, player_uuid=None, config=None, data_dir=None,
+                       game_dir=None, supervisor=None, name=None):
+    # The whole "click Launch" pipeline, meant to run on a TaskRunner worker.
+    # Every step checks for cancellation so the Cancel button works between steps too
+    task.report(f"Installing {version_id}")
+    with tracing.span("install_version", version=version_id):
+        install_version(version_id, minecraft_dir, task, config, data_dir)
+    task.report(f"Preparing {version_id}")
+    game_dir = game_dir or minecraft_dir
+    os.makedirs(game_dir, exist_ok=True)
+    with tracing.span("select_java", version=version_id):
+        java = select_java(version_id, minecraft_dir, data_dir, config)
+    requirement = required_java(version_id, minecraft_dir)
+    if not java and requirement and requirement.get("component"):
+        # Installed earlier (or by the prefetch), but the runtime isn't there
+        task.report(f"Installing Java runtime {requirement['component']}")
+        with tracing.span("install_runtime", component=requirement["component"]):
+            _install_managed_runtime(requirement["component"], minecraft_dir, task)
+        with tracing.span("select_java", version=version_id):
+            java = select_java(version_id, minecraft_dir, data_dir, config)
+    command = build_launch_command(version_id, minecraft_dir, username, player_uuid, data_dir, game_dir, config, java)
+    task.token.raise_if_cancelled()
+    return start_game(command, game_dir, supervisor, name, version_id)
@@ -0,0 +1,72 @@
+import logging
+import os
+import threading
+
+import pipeline
+from tasks import CancelledError
+
+DEFAULT_RATE_LIMIT = 4 * 1024 * 1024  # Bytes per second, leaves room for everything else on the link
+DEFAULT_WORKERS = 2
+
+
+def lower_priority():
+    # Linux nice values are per thread, and the download pool threads we spawn
+    # from here inherit it - so the whole prefetch runs at the bottom of the pile
+    try:
+        os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), 19)
+    except (AttributeError, OSError):
+        pass
+
+
+class Prefetcher:
+    # Quietly downloads the selected version in the background, slow and at low
+    # priority, so that by the time someone clicks Launch there's nothing left to
+    # fetch. Everything it finishes lands in the normal install locations (and the
+    # object store), so a launch that cancels it just continues from there.
+    def __init__(self, runner, minecraft_dir, data_dir):
+        self.runner = runner
+        self.minecraft_dir = minecraft_dir
+        self.data_dir = data_dir
+        self.task = None
+        self.version_id = None
+
+    def prefetch(self, version_id, config):
+        if not version_id or not config.get("prefetch", True):
+            return
+        if self.task and not self.task.cancelled and self.version_id == version_id:
+            return  # Already on it
+        self.cancel()
+
+        settings = dict(config)
+        settings["download_workers"] = config.get("prefetch_workers", DEFAULT_WORKERS)
+        settings["download_rate_limit"] = config.get("prefetch_rate_limit", DEFAULT_RATE_LIMIT)
+        self.version_id = version_id
+        self.task = self.runner.submit(
+            f"Prefetch {version_id}",
+            lambda task: self._run(task, version_id, settings),
+            on_done=self._on_done,
+            on_error=self._on_error
+        )
+
+    def _run(self, task, version_id, settings):
+        lower_priority()
+        # Game files only - the launch installs the Java runtime if it's needed
+        pipeline.install_version(version_id, self.minecraft_dir, task, settings, self.data_dir, runtime=False)
+
+    def _on_done(self, task, result):
+        logging.info(f"{task.name} finished, version is ready to launch.")
+        if task is self.task:
+            self.task = None
+
+    def _on_error(self, task, error):
+        if not isinstance(error, CancelledError):
+            # Not worth bothering anyone about, the real launch will retry
+            logging.warning(f"{task.name} failed: {error}")
+        if task is self.task:
+            self.task = None
+
+    def cancel(self):
+        if self.task:
+            logging.info(f"Cancelling {self.task.name}.")
+            self.task.cancel()
+            self.task = None
@@ -0,0 +1,142 @@
+import threading
+import time
+from contextlib import contextmanager
+
+RATE_WINDOW = 3.0  # Seconds of history behind the "current" speed and the ETA
+
+
+def format_bytes(amount):
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if amount < 1024 or unit == "GiB":
+            return f"{amount:.0f} {unit}" if unit == "B" else f"{amount:.1f} {unit}"
+        amount /= 1024
+
+
+def format_duration(seconds):
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+    return f"{seconds // 60}:{seconds % 60:02d}"
+
+
+class PhaseStats:
+    __slots__ = ("files", "bytes", "started", "finished")
+
+    def __init__(self):
+        self.files = 0
+        self.bytes = 0
+        self.started = None
+        self.finished = None
+
+
+class TransferStats:
+    # Running totals for one install: bytes and files, per phase (libraries,
+    # natives, jar, assets, ...), plus a short sliding window for the current
+    # speed and the ETA. The download threads only bump counters, all the math
+    # happens when someone asks (the UI, a few times a second at most).
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = time.monotonic()
+        self.files_total = 0
+        self.bytes_total = 0
+        self.files_done = 0
+        self.files_fetched = 0  # Actually downloaded, as opposed to already there
+        self.bytes_done = 0  # Over the network - what the speed is about
+        # Expected bytes on disk so far, however they got there (downloaded, already
+        # present, linked from the store, the start of a resumed .part) - what the
+        # ETA counts down
+        self.bytes_ready = 0
+        self.phases = {}
+        self._window = [(self.started, 0)]
+
+    def _phase(self, name):
+        phase = self.phases.get(name)
+        if phase is None:
+            phase = self.phases[name] = PhaseStats()
+        return phase
+
+    def expect(self, items):
+        with self._lock:
+            self.files_total += len(items)
+            self.bytes_total += sum(item.size or 0 for item in items)
+
+    def phase_started(self, name):
+        with self._lock:
+            phase = self._phase(name)
+            if phase.started is None:
+                phase.started = time.monotonic()
+
+    def add_bytes(self, name, amount):
+        with self._lock:
+            self.bytes_done += amount
+            self.bytes_ready += amount
+            self._phase(name).bytes += amount
+
+    def add_ready(self, amount):
+        # Bytes that are there without downloading them (a resume offset), or
+        # negative for ones we had to throw away again
+        with self._lock:
+            self.bytes_ready += amount
+
+    def file_done(self, name, fetched, size=None):
+        with self._lock:
+            self.files_done += 1
+            if fetched:
+                self.files_fetched += 1
+            else:
+                self.bytes_ready += size or 0
+            phase = self._phase(name)
+            phase.files += 1
+            phase.finished = time.monotonic()
+
+    @contextmanager
+    def timed(self, name):
+        # For the phases that aren't downloads (natives extraction, runtime, ...)
+        self.phase_started(name)
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._phase(name).finished = time.monotonic()
+
+    def rates(self):
+        # (bytes/s, files/s) over the last few seconds, and the ETA in seconds (or None)
+        now = time.monotonic()
+        with self._lock:
+            self._window.append((now, self.bytes_done))
+            while len(self._window) > 2 and now - self._window[1][0] > RATE_WINDOW:
+                self._window.pop(0)
+            since, bytes_then = self._window[0]
+            elapsed = now - since
+            byte_rate = (self.bytes_done - bytes_then) / elapsed if elapsed > 0 else 0
+            total_elapsed = now - self.started
+            file_rate = self.files_done / total_elapsed if total_elapsed > 0 else 0
+            eta = None
+            if byte_rate > 0 and self.bytes_total > self.bytes_ready:
+                eta = (self.bytes_total - self.bytes_ready) / byte_rate
+            elif file_rate > 0 and self.files_total > self.files_done:
+                eta = (self.files_total - self.files_done) / file_rate
+        return byte_rate, file_rate, eta
+
+    def describe(self):
+        byte_rate, file_rate, eta = self.rates()
+        text = f"{format_bytes(byte_rate)}/s, {file_rate:.0f} files/s"
+        if eta is not None:
+            text += f", {format_duration(eta)} left"
+        return text
+
+    def summary(self):
+        elapsed = time.monotonic() - self.started
+        average = self.bytes_done / elapsed if elapsed > 0 else 0
+        parts = []
+        with self._lock:
+            for name, phase in sorted(self.phases.items(), key=lambda entry: entry[1].started or 0):
+                if phase.started is None:
+                    continue
+                took = (phase.finished or phase.started) - phase.started
+                parts.append(f"{name} {took:.2f}s ({phase.files} files, {format_bytes(phase.bytes)})")
+            text = (f"{self.files_done} files checked, {self.files_fetched} downloaded, "
+                    f"{format_bytes(self.bytes_done)} in {elapsed:.2f}s ({format_bytes(average)}/s)")
+        if parts:
+            text += ". " + ", ".join(parts)
+        return text
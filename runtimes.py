@@ -0,0 +1,238 @@
+import glob
+import json
+import logging
+import os
+import platform
+import re
+import shutil
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+INDEX_FORMAT = 1
+PROBE_TIMEOUT = 10
+PROBE_WORKERS = 4
+# Minecraft 1.17+ is happy on any newer Java, older versions really want the one they ask for
+NEWER_JAVA_OK_FROM = 16
+
+# Where distros, SDKMAN and IDEs like to put JDKs
+SYSTEM_JAVA_GLOBS = [
+    "/usr/lib/jvm/*/bin/java",
+    "/usr/lib64/jvm/*/bin/java",
+    "/usr/java/*/bin/java",
+    "/opt/*/bin/java",
+    "/opt/java/*/bin/java",
+    "~/.sdkman/candidates/java/*/bin/java",
+    "~/.jdks/*/bin/java",
+]
+
+ARCH_ALIASES = {
+    "amd64": "x86_64",
+    "x86_64": "x86_64",
+    "x64": "x86_64",
+    "aarch64": "aarch64",
+    "arm64": "aarch64",
+    "x86": "x86",
+    "i386": "x86",
+    "i686": "x86",
+}
+
+
+def normalize_arch(arch):
+    arch = (arch or "").lower()
+    return ARCH_ALIASES.get(arch, arch)
+
+
+def required_java(version_id, minecraft_dir):
+    # The javaVersion block ({"component", "majorVersion"}) of a version, following
+    # inheritsFrom for modloaders. None if none of the JSONs say.
+    seen = set()
+    while version_id and version_id not in seen:
+        seen.add(version_id)
+        path = os.path.join(minecraft_dir, "versions", version_id, f"{version_id}.json")
+        try:
+            with open(path, "r") as f:
+                version_data = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+        if version_data.get("javaVersion"):
+            return version_data["javaVersion"]
+        version_id = version_data.get("inheritsFrom")
+    return None
+
+
+def parse_major(version):
+    # "1.8.0_392" -> 8, "17.0.9" -> 17, "21" -> 21
+    match = re.match(r"(\d+)(?:\.(\d+))?", version or "")
+    if not match:
+        return None
+    major = int(match.group(1))
+    if major == 1 and match.group(2):
+        return int(match.group(2))
+    return major
+
+
+def probe_java(path):
+    # Ask the JVM itself - no guessing from directory names
+    try:
+        result = subprocess.run([path, "-XshowSettings:properties", "-version"], stdin=subprocess.DEVNULL,
+                                stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=PROBE_TIMEOUT)
+    except (OSError, subprocess.SubprocessError) as e:
+        logging.info(f"Could not probe {path}: {e}")
+        return None
+    properties = {}
+    for line in result.stderr.decode("utf-8", errors="replace").splitlines():
+        key, sep, value = line.strip().partition(" = ")
+        if sep:
+            properties[key] = value
+    version = properties.get("java.version")
+    major = parse_major(properties.get("java.specification.version") or version)
+    if not major:
+        return None
+    return {
+        "version": version,
+        "major": major,
+        "arch": normalize_arch(properties.get("os.arch")),
+        "vendor": properties.get("java.vendor", "")
+    }
+
+
+class RuntimeIndex:
+    # Every Java on the machine (distro JDKs, JAVA_HOME, PATH, SDKMAN, and the
+    # runtimes Mojang's installer put under minecraft_dir/runtime) with the
+    # version and architecture the binary reported, cached in
+    # data_dir/cache/runtimes.json. After the first scan, picking a runtime for
+    # a launch is a stat() per entry - we only run java again when a binary changed.
+    def __init__(self, data_dir, minecraft_dir=None):
+        self.minecraft_dir = minecraft_dir or data_dir
+        self.path = os.path.join(data_dir, "cache", "runtimes.json")
+        self.arch = normalize_arch(platform.machine())
+        self._runtimes = None
+
+    def _load(self):
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+        if data.get("format") != INDEX_FORMAT:
+            return None
+        return data.get("runtimes", [])
+
+    def _save(self, runtimes):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w") as f:
+            json.dump({"format": INDEX_FORMAT, "scanned_at": time.time(), "runtimes": runtimes}, f)
+        os.replace(temp_path, self.path)
+
+    def candidates(self):
+        # (resolved path, source), managed runtimes first. Only listdir()s, no java runs
+        found = []
+        managed = os.path.join(self.minecraft_dir, "runtime", "*", "*", "*", "bin", "java")
+        found += [(path, "managed") for path in sorted(glob.glob(managed))]
+        java_home = os.environ.get("JAVA_HOME")
+        if java_home:
+            found.append((os.path.join(java_home, "bin", "java"), "JAVA_HOME"))
+        on_path = shutil.which("java")
+        if on_path:
+            found.append((on_path, "PATH"))
+        for pattern in SYSTEM_JAVA_GLOBS:
+            found += [(path, "system") for path in sorted(glob.glob(os.path.expanduser(pattern)))]
+
+        seen = set()
+        unique = []
+        for path, source in found:
+            real = os.path.realpath(path)
+            if real not in seen and os.access(real, os.X_OK):
+                seen.add(real)
+                unique.append((real, source))
+        return unique
+
+    def _probe_all(self, candidates, known):
+        # Reuse what we know about binaries that haven't changed, probe the rest in parallel
+        runtimes = []
+        to_probe = []
+        for path, source in candidates:
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entry = known.get(path)
+            if entry and entry["size"] == st.st_size and entry["mtime_ns"] == st.st_mtime_ns:
+                runtimes.append(dict(entry, source=source))
+            else:
+                to_probe.append((path, source, st))
+        if to_probe:
+            start = time.monotonic()
+            with ThreadPoolExecutor(max_workers=PROBE_WORKERS) as executor:
+                results = list(executor.map(lambda candidate: probe_java(candidate[0]), to_probe))
+            for (path, source, st), info in zip(to_probe, results):
+                if info:
+                    runtimes.append(dict(info, path=path, source=source, size=st.st_size, mtime_ns=st.st_mtime_ns))
+            logging.info(f"Probed {len(to_probe)} Java runtime(s) in {time.monotonic() - start:.2f}s.")
+        return runtimes
+
+    def runtimes(self, rescan=False):
+        if self._runtimes is not None and not rescan:
+            return self._runtimes
+        cached = self._load()
+        known = {entry["path"]: entry for entry in cached or []}
+        if cached is None or rescan:
+            runtimes = self._probe_all(self.candidates(), known)
+        else:
+            # Just make sure nothing we remember moved or got upgraded
+            runtimes = self._probe_all([(entry["path"], entry["source"]) for entry in cached], known)
+        if runtimes != cached:
+            self._save(runtimes)
+        self._runtimes = runtimes
+        return runtimes
+
+    def _pick(self, runtimes, requirement, managed_only=False):
+        usable = [entry for entry in runtimes if entry["arch"] == self.arch]
+        if managed_only:
+            usable = [entry for entry in usable if entry["source"] == "managed"]
+        if not requirement:
+            # No javaVersion at all means something ancient - Java 8 if we have it
+            return next((entry for entry in usable if entry["major"] == 8), usable[0] if usable else None)
+        major = requirement.get("majorVersion")
+        component = requirement.get("component")
+        if component:
+            # Exactly what Mojang ships for this version, if it's already here
+            for entry in usable:
+                if entry["source"] == "managed" and f"{os.sep}runtime{os.sep}{component}{os.sep}" in entry["path"]:
+                    return entry
+        if not major:
+            return None
+        exact = [entry for entry in usable if entry["major"] == major]
+        if exact:
+            return exact[0]
+        if major >= NEWER_JAVA_OK_FROM:
+            newer = sorted((entry for entry in usable if entry["major"] > major), key=lambda entry: entry["major"])
+            if newer:
+                return newer[0]
+        return None
+
+    def select(self, requirement, managed_only=False):
+        # Best runtime for a javaVersion requirement, or None if nothing here fits.
+        # A miss rescans once, since a JDK may have been installed since the last scan
+        runtime = self._pick(self.runtimes(), requirement, managed_only)
+        if runtime is None:
+            runtime = self._pick(self.runtimes(rescan=True), requirement, managed_only)
+        return runtime
+
+    def lookup(self, path):
+        # A specific java binary (from the config), probed once and then cached like the rest
+        real = os.path.realpath(path)
+        runtimes = self.runtimes()
+        known = {entry["path"]: entry for entry in runtimes}
+        entries = self._probe_all([(real, "config")], known)
+        if not entries:
+            return None
+        if entries[0] != known.get(real):
+            self._runtimes = [entry for entry in runtimes if entry["path"] != real] + entries
+            self._save(self._runtimes)
+        return entries[0]
+
+    def describe(self):
+        return ", ".join(f"Java {entry['major']} ({entry['arch']})" for entry in self.runtimes()) or "none"
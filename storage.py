@@ -0,0 +1,354 @@
+import collections
+import json
+import logging
+import os
+import shutil
+import time
+
+from downloader import Downloader, maven_path, rules_allow
+from install_index import InstallIndex
+from launch_plan import LaunchPlanCache, version_fingerprint
+
+SCAN_FORMAT = 1
+VERSIONS = "versions"
+ASSETS = "assets"
+# Everything the launcher downloads lives under these. Saves, instances, the
+# managed Java runtime, the object store etc. are never touched.
+MANAGED_ROOTS = [VERSIONS, "libraries", ASSETS]
+# Only ever downloaded by us, so anything in here no version needs can go. The
+# rest of assets/ (skins the game caches, legacy virtual assets) stays.
+DOWNLOADED_ASSETS = tuple(os.path.join(ASSETS, name) + os.sep for name in ("indexes", "objects", "log_configs"))
+# Leftovers of interrupted downloads are only garbage once nobody could still be writing them
+STALE_TEMP_AGE = 24 * 60 * 60
+
+
+class StorageError(Exception):
+    pass
+
+
+def _is_temp(rel):
+    return rel.endswith((".part", ".tmp"))
+
+
+class StorageIndex:
+    # Which installed version needs which file. Each version JSON (parents
+    # included) and its asset index reference a set of libraries, jars and asset
+    # objects, a file nothing references anymore is garbage. Kept in
+    # data_dir/cache/storage.json and only redone where something changed:
+    # a directory's listing is reused while its mtime stays the same, a
+    # version's references while its JSONs and asset index do.
+    #
+    # Forge & co. also write files (processed client jars and such) into
+    # libraries/ that no version JSON mentions. So apart from downloaded assets only
+    # files some version referenced at one point ("owned") are ever collected,
+    # everything else is left alone.
+    def __init__(self, minecraft_dir, data_dir=None, store=None):
+        self.minecraft_dir = minecraft_dir
+        self.data_dir = data_dir or minecraft_dir
+        self.store = store
+        self.cache_path = os.path.join(self.data_dir, "cache", "storage.json")
+        self.files = {}  # relative path -> size, for everything under MANAGED_ROOTS
+        self.references = {}  # version id -> set of relative paths
+        self.owned = set()
+        self._chains = {}
+        self._dirs = {}
+        self._versions = {}
+
+    # --- incremental scan ---
+
+    def _load(self):
+        try:
+            with open(self.cache_path, "r") as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return
+        if data.get("format") == SCAN_FORMAT:
+            self._dirs = data.get("dirs", {})
+            self._versions = data.get("versions", {})
+            self.owned = set(data.get("owned", []))
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+        temp_path = self.cache_path + ".tmp"
+        with open(temp_path, "w") as f:
+            json.dump({"format": SCAN_FORMAT, "dirs": self._dirs, "versions": self._versions,
+                       "owned": sorted(self.owned)}, f)
+        os.replace(temp_path, self.cache_path)
+
+    def _scan_dir(self, rel_dir, seen_dirs):
+        path = os.path.join(self.minecraft_dir, rel_dir)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return 0
+        cached = self._dirs.get(rel_dir)
+        listed = 0
+        if cached is None or cached[0] != mtime:
+            # Adding, removing or renaming an entry bumps the directory's mtime, and
+            # every download lands through a rename - so same mtime, same contents
+            files = {}
+            subdirs = []
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.name)
+                    elif entry.is_file(follow_symlinks=False):
+                        files[entry.name] = entry.stat(follow_symlinks=False).st_size
+            cached = [mtime, files, subdirs]
+            listed = 1
+        seen_dirs[rel_dir] = cached
+        for name, size in cached[1].items():
+            self.files[os.path.join(rel_dir, name)] = size
+        for name in cached[2]:
+            listed += self._scan_dir(os.path.join(rel_dir, name), seen_dirs)
+        return listed
+
+    def _files_under(self, rel_dir):
+        found = []
+        entry = self._dirs.get(rel_dir)
+        if entry:
+            found.extend(os.path.join(rel_dir, name) for name in entry[1])
+            for name in entry[2]:
+                found.extend(self._files_under(os.path.join(rel_dir, name)))
+        return found
+
+    def _read_json(self, path):
+        try:
+            with open(path, "r") as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+
+    def _chain(self, version_id):
+        # [(id, version JSON)], version_id first, straight from disk
+        chain = []
+        while version_id and version_id not in [chain_id for chain_id, data in chain]:
+            data = self._read_json(os.path.join(self.minecraft_dir, VERSIONS, version_id, f"{version_id}.json"))
+            if data is None:
+                break
+            chain.append((version_id, data))
+            version_id = data.get("inheritsFrom")
+        return chain
+
+    def _asset_index(self, data):
+        asset_index = data.get("assetIndex")
+        if not asset_index:
+            return None
+        return os.path.join(ASSETS, "indexes", f"{data.get('assets', asset_index['id'])}.json")
+
+    def _version_key(self, version_id, chain):
+        # Changes whenever the version's JSONs or its asset index do
+        fingerprint = version_fingerprint(version_id, self.minecraft_dir)
+        if not fingerprint:
+            return None
+        parts = [fingerprint]
+        for chain_id, data in chain:
+            index_rel = self._asset_index(data)
+            if index_rel:
+                try:
+                    st = os.stat(os.path.join(self.minecraft_dir, index_rel))
+                    parts.append(f"{index_rel}:{st.st_size}:{st.st_mtime_ns}")
+                except OSError:
+                    parts.append(f"{index_rel}:missing")
+        return "|".join(parts)
+
+    def _compute_references(self, chain):
+        # Same files an install would produce, but strictly from what's on disk -
+        # no network, nothing gets downloaded for a missing parent or asset index
+        downloader = Downloader(self.minecraft_dir)
+        refs = set()
+        try:
+            for chain_id, data in chain:
+                items, natives = downloader.collect_items(data)
+                refs.update(os.path.relpath(item.path, self.minecraft_dir) for item in items)
+                for lib in data.get("libraries", []):
+                    # Libraries without a URL come from a modloader installer, still needed
+                    artifact = lib.get("downloads", {}).get("artifact")
+                    if artifact is not None and rules_allow(lib.get("rules")):
+                        refs.add(os.path.join("libraries", artifact.get("path") or maven_path(lib["name"])))
+                index_rel = self._asset_index(data)
+                if not index_rel:
+                    continue
+                refs.add(index_rel)
+                index = self._read_json(os.path.join(self.minecraft_dir, index_rel)) or {}
+                for obj in index.get("objects", {}).values():
+                    refs.add(os.path.join(ASSETS, "objects", obj["hash"][:2], obj["hash"]))
+        finally:
+            downloader.close()
+        return refs
+
+    def installed_versions(self):
+        versions_dir = os.path.join(self.minecraft_dir, VERSIONS)
+        try:
+            names = sorted(os.listdir(versions_dir))
+        except OSError:
+            return []
+        return [name for name in names if os.path.isfile(os.path.join(versions_dir, name, f"{name}.json"))]
+
+    def scan(self):
+        start = time.monotonic()
+        self._load()
+        self.files = {}
+        seen_dirs = {}
+        listed = sum(self._scan_dir(root, seen_dirs) for root in MANAGED_ROOTS)
+        self._dirs = seen_dirs
+
+        self.references = {}
+        self._chains = {}
+        versions = {}
+        recomputed = 0
+        for version_id in self.installed_versions():
+            chain = self._chain(version_id)
+            key = self._version_key(version_id, chain)
+            cached = self._versions.get(version_id)
+            if key and cached and cached[0] == key:
+                refs = set(cached[1])
+            else:
+                refs = self._compute_references(chain)
+                recomputed += 1
+            versions[version_id] = [key, sorted(refs)]
+            self._chains[version_id] = [chain_id for chain_id, data in chain]
+            # Everything in versions/<id> (jar, JSON, extracted natives, ...) goes with it
+            for chain_id in self._chains[version_id]:
+                refs.update(self._files_under(os.path.join(VERSIONS, chain_id)))
+            self.references[version_id] = refs
+            self.owned.update(refs)
+        self._versions = versions
+        self.owned.intersection_update(self.files)
+        self._save()
+        logging.info(f"Storage scan: {len(self.files)} files, {len(self.references)} versions, "
+                     f"listed {listed} of {len(seen_dirs)} directories, recomputed {recomputed} versions "
+                     f"in {time.monotonic() - start:.2f}s")
+        return self
+
+    # --- reporting ---
+
+    def reference_counts(self, excluding=()):
+        counts = collections.Counter()
+        for version_id, refs in self.references.items():
+            if version_id not in excluding:
+                counts.update(refs)
+        return counts
+
+    def usage(self):
+        # {version: (bytes it uses, bytes only it uses)} - the second number is
+        # roughly what removing it would free
+        counts = self.reference_counts()
+        report = {}
+        for version_id, refs in self.references.items():
+            total = exclusive = 0
+            for rel in refs:
+                size = self.files.get(rel, 0)
+                total += size
+                if counts[rel] == 1:
+                    exclusive += size
+            report[version_id] = (total, exclusive)
+        return report
+
+    def dependents(self, version_id):
+        # Installed versions that inherit from version_id
+        return [other for other, chain in self._chains.items() if other != version_id and version_id in chain]
+
+    # --- removal ---
+
+    def _collectable(self, rel):
+        if _is_temp(rel):
+            try:
+                return time.time() - os.path.getmtime(os.path.join(self.minecraft_dir, rel)) > STALE_TEMP_AGE
+            except OSError:
+                return False
+        return rel.startswith(DOWNLOADED_ASSETS) or rel in self.owned
+
+    def garbage(self, excluding=()):
+        # Files nothing references anymore once the excluded versions are gone
+        counts = self.reference_counts(excluding)
+        return sorted(rel for rel in self.files if not counts[rel] and self._collectable(rel))
+
+    def _store_garbage(self, doomed):
+        # Objects in the store that only the doomed files still link to. Anything
+        # else stays, even at st_nlink 1: reflinked or copied objects (a shared
+        # store on another filesystem) never have a second link, and other data
+        # dirs may still be using them
+        if not self.store or not os.path.isdir(self.store.root):
+            return []
+        doomed_links = collections.Counter()
+        for path in doomed:
+            try:
+                st = os.stat(path)
+                doomed_links[(st.st_dev, st.st_ino)] += 1
+            except OSError:
+                pass
+        unused = []
+        for prefix in os.scandir(self.store.root):
+            if not prefix.is_dir(follow_symlinks=False):
+                continue
+            for entry in os.scandir(prefix.path):
+                if not entry.is_file(follow_symlinks=False) or _is_temp(entry.name):
+                    continue
+                st = entry.stat(follow_symlinks=False)
+                links = doomed_links[(st.st_dev, st.st_ino)]
+                if links and st.st_nlink - links <= 1:
+                    unused.append(entry.path)
+        return unused
+
+    def _delete(self, paths, dry_run):
+        # Bytes actually freed: a hardlinked file only frees its blocks with its last link
+        inodes = {}
+        for path in paths:
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            size, nlink, deleted = inodes.get((st.st_dev, st.st_ino), (st.st_size, st.st_nlink, 0))
+            inodes[(st.st_dev, st.st_ino)] = (size, nlink, deleted + 1)
+            if not dry_run:
+                os.remove(path)
+        return sum(size for size, nlink, deleted in inodes.values() if deleted >= nlink)
+
+    def _remove_empty_dirs(self):
+        for root in MANAGED_ROOTS:
+            top = os.path.join(self.minecraft_dir, root)
+            for dirpath, dirnames, filenames in os.walk(top, topdown=False):
+                if dirpath != top and not os.listdir(dirpath):
+                    os.rmdir(dirpath)
+
+    def _sweep(self, rels, dry_run):
+        doomed = [os.path.join(self.minecraft_dir, rel) for rel in rels]
+        # Store objects first, while the doomed files still show which inodes they are
+        doomed += self._store_garbage(doomed)
+        freed = self._delete(doomed, dry_run)
+        if not dry_run:
+            self._remove_empty_dirs()
+            self.scan()
+        return len(doomed), freed
+
+    def remove_versions(self, version_ids, dry_run=True):
+        # Drops the versions and every file only they were using. Returns
+        # (files, bytes) deleted - or that would be, for a dry run
+        for version_id in version_ids:
+            if version_id not in self.references:
+                raise StorageError(f"{version_id} is not installed")
+            blocking = [other for other in self.dependents(version_id) if other not in version_ids]
+            if blocking:
+                raise StorageError(f"{version_id} is needed by {', '.join(blocking)}, remove those too")
+        rels = set(self.garbage(excluding=version_ids))
+        for version_id in version_ids:
+            rels.update(self._files_under(os.path.join(VERSIONS, version_id)))
+        if not dry_run:
+            install_index = InstallIndex(self.data_dir, self.minecraft_dir)
+            plans = LaunchPlanCache(self.data_dir)
+            for version_id in version_ids:
+                install_index.invalidate(version_id)
+                plans.invalidate(version_id)
+                shutil.rmtree(os.path.join(self.data_dir, "cache", "cds", version_id), ignore_errors=True)
+        count, freed = self._sweep(sorted(rels), dry_run)
+        logging.info(f"{'Would remove' if dry_run else 'Removed'} {', '.join(version_ids)}: "
+                     f"{count} files, {freed} bytes")
+        return count, freed
+
+    def collect_garbage(self, dry_run=True):
+        # Orphans left behind by versions deleted by hand, old asset indexes,
+        # stale partial downloads - and the store objects only those were linked to
+        count, freed = self._sweep(self.garbage(), dry_run)
+        logging.info(f"{'Would collect' if dry_run else 'Collected'} {count} unused files, {freed} bytes")
+        return count, freed
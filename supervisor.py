@@ -0,0 +1,204 @@
+import collections
+import itertools
+import logging
+import os
+import subprocess
+import threading
+import time
+
+LOG_LINES = 2000  # Per instance, oldest lines fall off the end
+LOG_POLL_INTERVAL = 0.2
+LOGS_KEPT = 50  # Log files of earlier games, the oldest get deleted
+SAMPLE_INTERVAL = 1.0
+SAMPLES_KEPT = 600  # Ten minutes of history at one sample a second
+
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def read_proc_usage(pid):
+    # (cpu ticks used so far, resident bytes) straight from /proc, or None once
+    # the process is gone
+    try:
+        with open(f"/proc/{pid}/stat", "r") as f:
+            stat = f.read()
+        with open(f"/proc/{pid}/statm", "r") as f:
+            statm = f.read().split()
+    except OSError:
+        return None
+    # The command name can contain spaces and parens, so split after the last ')'
+    fields = stat[stat.rfind(")") + 2:].split()
+    utime, stime = int(fields[11]), int(fields[12])
+    return utime + stime, int(statm[1]) * PAGE_SIZE
+
+
+class GameInstance:
+    def __init__(self, instance_id, name, version_id, process, log_path):
+        self.id = instance_id
+        self.name = name
+        self.version_id = version_id
+        self.process = process
+        self.log_path = log_path
+        self.pid = process.pid
+        self.started_at = time.monotonic()
+        self.started_wall = time.time()
+        self.first_log_at = None
+        self.ended_at = None
+        self.exit_code = None
+        # The tail of log_path - deque appends are atomic, so the reader thread
+        # never has to wait on the UI
+        self.log = collections.deque(maxlen=LOG_LINES)
+        self.lines_seen = 0  # Keeps counting after the deque starts dropping lines
+        # (monotonic time, cpu percent, rss bytes)
+        self.samples = collections.deque(maxlen=SAMPLES_KEPT)
+        self.peak_rss = 0
+        self._last_ticks = None
+        self._last_sample_at = None
+
+    @property
+    def running(self):
+        return self.exit_code is None
+
+    @property
+    def time_to_first_log(self):
+        if self.first_log_at is None:
+            return None
+        return self.first_log_at - self.started_at
+
+    @property
+    def uptime(self):
+        return (self.ended_at or time.monotonic()) - self.started_at
+
+    def latest_sample(self):
+        return self.samples[-1] if self.samples else None
+
+    def log_text(self, lines=None):
+        entries = list(self.log)
+        if lines:
+            entries = entries[-lines:]
+        return "".join(entries)
+
+    def sample(self):
+        usage = read_proc_usage(self.pid)
+        if usage is None:
+            return
+        ticks, rss = usage
+        now = time.monotonic()
+        cpu = 0.0
+        if self._last_ticks is not None and now > self._last_sample_at:
+            # Can go over 100% - that's Java using more than one core
+            cpu = (ticks - self._last_ticks) / CLOCK_TICKS / (now - self._last_sample_at) * 100
+        self._last_ticks = ticks
+        self._last_sample_at = now
+        self.peak_rss = max(self.peak_rss, rss)
+        self.samples.append((now, cpu, rss))
+
+
+class Supervisor:
+    # Keeps track of every game we start: their output (in bounded per-instance
+    # ring buffers), CPU and memory from /proc, how long until the first log line
+    # and how they exited. One log reader per game plus one shared sampler.
+    #
+    # Games write stdout and stderr straight into a file in log_dir, never into
+    # a pipe to us - so closing the launcher doesn't break their output, they
+    # just keep running and logging like they always did.
+    def __init__(self, log_dir):
+        self.log_dir = log_dir
+        self.instances = collections.OrderedDict()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._sampler = None
+
+    def _prune_logs(self):
+        try:
+            names = sorted(name for name in os.listdir(self.log_dir) if name.endswith(".log"))
+        except OSError:
+            return
+        for name in names[:-LOGS_KEPT]:
+            try:
+                os.remove(os.path.join(self.log_dir, name))
+            except OSError:
+                pass
+
+    def start(self, command, cwd, name=None, version_id=None):
+        instance_id = next(self._ids)
+        os.makedirs(self.log_dir, exist_ok=True)
+        self._prune_logs()
+        log_path = os.path.join(self.log_dir, f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{instance_id}.log")
+        with open(log_path, "wb") as log_file:
+            process = subprocess.Popen(command, cwd=cwd, stdin=subprocess.DEVNULL,
+                                       stdout=log_file, stderr=subprocess.STDOUT)
+        instance = GameInstance(instance_id, name or version_id or "game", version_id, process, log_path)
+        with self._lock:
+            self.instances[instance.id] = instance
+            if self._sampler is None or not self._sampler.is_alive():
+                self._sampler = threading.Thread(target=self._sample_loop, name="game-sampler", daemon=True)
+                self._sampler.start()
+        threading.Thread(target=self._follow_log, args=(instance,), name=f"game-{instance.id}-log", daemon=True).start()
+        threading.Thread(target=self._wait, args=(instance,), name=f"game-{instance.id}-wait", daemon=True).start()
+        logging.info(f"Started {instance.name} (instance {instance.id}) with pid {instance.pid}, logging to {log_path}")
+        return instance
+
+    def _add_line(self, instance, raw):
+        if instance.first_log_at is None:
+            instance.first_log_at = time.monotonic()
+            logging.info(f"{instance.name}: first log line after {instance.time_to_first_log:.2f}s")
+        instance.log.append(raw.decode("utf-8", errors="replace"))
+        instance.lines_seen += 1
+
+    def _follow_log(self, instance):
+        # tail -f until the game is gone and everything it wrote has been read
+        pending = b""
+        with open(instance.log_path, "rb") as f:
+            while True:
+                finished = not instance.running
+                for raw in iter(f.readline, b""):
+                    pending += raw
+                    if pending.endswith(b"\n"):
+                        self._add_line(instance, pending)
+                        pending = b""
+                if finished:
+                    break
+                time.sleep(LOG_POLL_INTERVAL)
+        if pending:
+            self._add_line(instance, pending)
+
+    def _wait(self, instance):
+        exit_code = instance.process.wait()
+        instance.ended_at = time.monotonic()
+        instance.exit_code = exit_code
+        peak = instance.peak_rss / (1024 * 1024)
+        logging.info(f"{instance.name} (pid {instance.pid}) exited with code {exit_code} "
+                     f"after {instance.uptime:.1f}s, peak RSS {peak:.0f} MiB")
+
+    def _sample_loop(self):
+        while True:
+            with self._lock:
+                running = [instance for instance in self.instances.values() if instance.running]
+                if not running:
+                    self._sampler = None
+                    return
+            for instance in running:
+                instance.sample()
+            time.sleep(SAMPLE_INTERVAL)
+
+    def list(self):
+        with self._lock:
+            return list(self.instances.values())
+
+    def get(self, instance_id):
+        with self._lock:
+            return self.instances.get(instance_id)
+
+    def running_count(self):
+        return sum(1 for instance in self.list() if instance.running)
+
+    def stop(self, instance_id):
+        instance = self.get(instance_id)
+        if instance and instance.running:
+            instance.process.terminate()
+
+    def forget_finished(self):
+        with self._lock:
+            for instance_id in [i for i, instance in self.instances.items() if not instance.running]:
+                del self.instances[instance_id]
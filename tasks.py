@@ -0,0 +1,140 @@
+import logging
+import queue
+import threading
+import time
+
+REPORT_INTERVAL = 0.1  # Cap on progress updates per task that make it to the UI
+
+
+class CancelledError(Exception):
+    pass
+
+
+class CancelToken:
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def raise_if_cancelled(self):
+        if self._event.is_set():
+            raise CancelledError()
+
+
+class Task:
+    def __init__(self, runner, name, func, on_progress=None, on_done=None, on_error=None):
+        self.runner = runner
+        self.name = name
+        self.func = func
+        self.on_progress = on_progress
+        self.on_done = on_done
+        self.on_error = on_error
+        self.token = CancelToken()
+        # Whatever is doing the work can hang a progress.TransferStats here for
+        # speed / ETA / per-phase numbers, the UI reads it when it redraws
+        self.metrics = None
+        self._last_status = None
+        self._last_report = 0
+
+    def cancel(self):
+        self.token.cancel()
+
+    @property
+    def cancelled(self):
+        return self.token.cancelled
+
+    def report(self, status=None, current=None, total=None):
+        # Called from the worker thread - bail out early if somebody hit Cancel,
+        # then hand the numbers over to the main loop. Hot loops can call this for
+        # every file: only new statuses, the final tick and one update every
+        # REPORT_INTERVAL actually get dispatched, the rest cost a clock read
+        self.token.raise_if_cancelled()
+        if not self.on_progress:
+            return
+        now = time.monotonic()
+        if status == self._last_status and now - self._last_report < REPORT_INTERVAL and (not total or current < total):
+            return
+        self._last_status = status
+        self._last_report = now
+        self.runner.dispatch(self.on_progress, self, status, current, total)
+
+
+class TaskRunner:
+    # One worker thread chewing through a FIFO queue. Installs are disk and network
+    # bound anyway, so running them one after another keeps things predictable and
+    # lets a second launch simply queue up behind the first one.
+    def __init__(self, dispatch=None):
+        # dispatch(fn, *args) must run fn on the UI thread (GLib.idle_add for GTK).
+        # Without one, callbacks just run on the worker thread (handy for scripts).
+        self._dispatch = dispatch
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._pending = []
+        self.current = None
+        self._thread = threading.Thread(target=self._worker, name="launcher-worker", daemon=True)
+        self._thread.start()
+
+    def dispatch(self, fn, *args):
+        if self._dispatch is None:
+            fn(*args)
+            return
+
+        def call():
+            fn(*args)
+            return False  # Don't let GLib reschedule us
+        self._dispatch(call)
+
+    def submit(self, name, func, on_progress=None, on_done=None, on_error=None):
+        task = Task(self, name, func, on_progress, on_done, on_error)
+        with self._lock:
+            self._pending.append(task)
+        self._queue.put(task)
+        logging.info(f"Queued task: {name}")
+        return task
+
+    def pending_count(self):
+        with self._lock:
+            return len(self._pending)
+
+    def cancel_all(self):
+        with self._lock:
+            tasks = list(self._pending)
+            if self.current:
+                tasks.append(self.current)
+        for task in tasks:
+            task.cancel()
+
+    def shutdown(self):
+        self.cancel_all()
+        self._queue.put(None)
+
+    def _worker(self):
+        while True:
+            task = self._queue.get()
+            if task is None:
+                break
+            with self._lock:
+                self._pending.remove(task)
+                self.current = task
+            try:
+                task.token.raise_if_cancelled()
+                result = task.func(task)
+            except CancelledError:
+                logging.info(f"Task cancelled: {task.name}")
+                if task.on_error:
+                    self.dispatch(task.on_error, task, CancelledError())
+            except Exception as e:
+                logging.exception(f"Task failed: {task.name}: {e}")
+                if task.on_error:
+                    self.dispatch(task.on_error, task, e)
+            else:
+                if task.on_done:
+                    self.dispatch(task.on_done, task, result)
+            finally:
+                with self._lock:
+                    self.current = None
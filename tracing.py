@@ -0,0 +1,91 @@
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Set HACKERMAN_TRACE=/some/file.json (or cli.py --trace) to record where the
+# time goes - load_versions, installs, the launch command, Popen - as a Chrome
+# trace. Open it in ui.perfetto.dev or chrome://tracing. Off by default, a
+# disabled span costs next to nothing.
+TRACE_ENV = "HACKERMAN_TRACE"
+
+_lock = threading.Lock()
+_path = None
+_events = []
+_named_threads = set()
+_origin = time.perf_counter()
+
+
+def enabled():
+    return _path is not None
+
+
+def enable(path):
+    global _path
+    with _lock:
+        first = _path is None
+        _path = path
+    if first:
+        _events.append({"name": "process_name", "ph": "M", "pid": os.getpid(), "tid": 0,
+                        "args": {"name": "hackerman-launcher"}})
+        atexit.register(save)
+    logging.info(f"Tracing to {path}")
+
+
+def enable_from_env():
+    path = os.environ.get(TRACE_ENV)
+    if path:
+        enable(path)
+
+
+def _now_us():
+    return (time.perf_counter() - _origin) * 1e6
+
+
+def _record(event):
+    thread = threading.current_thread()
+    event["pid"] = os.getpid()
+    event["tid"] = thread.ident
+    with _lock:
+        if thread.ident not in _named_threads:
+            # Worker threads show up under their names instead of bare ids
+            _named_threads.add(thread.ident)
+            _events.append({"name": "thread_name", "ph": "M", "pid": event["pid"], "tid": thread.ident,
+                            "args": {"name": thread.name}})
+        _events.append(event)
+
+
+@contextmanager
+def span(name, **args):
+    if _path is None:
+        yield
+        return
+    start = _now_us()
+    try:
+        yield
+    finally:
+        _record({"name": name, "ph": "X", "ts": start, "dur": _now_us() - start, "args": args})
+
+
+def instant(name, **args):
+    if _path is not None:
+        _record({"name": name, "ph": "i", "s": "t", "ts": _now_us(), "args": args})
+
+
+def save():
+    if _path is None:
+        return
+    with _lock:
+        data = {"traceEvents": list(_events), "displayTimeUnit": "ms"}
+    directory = os.path.dirname(_path) or "."
+    os.makedirs(directory, exist_ok=True)
+    temp_path = f"{_path}.{os.getpid()}.tmp"
+    try:
+        with open(temp_path, "w") as f:
+            json.dump(data, f)
+        os.replace(temp_path, _path)
+    except OSError as e:
+        logging.warning(f"Could not write the trace to {_path}: {e}")
@@ -0,0 +1,210 @@
+#! /usr/bin/env python3
+import argparse
+import contextlib
+import hashlib
+import json
+import logging
+import mmap
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from downloader import Downloader
+from install_index import InstallIndex
+from launch_plan import version_fingerprint
+
+MMAP_THRESHOLD = 1024 * 1024  # Anything bigger gets mapped instead of read()
+BATCH_SIZE = 64  # Assets are tiny, so ship them to the workers in batches
+CHECKPOINT_INTERVAL = 2.0
+
+
+def hash_file(path):
+    try:
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size >= MMAP_THRESHOLD:
+                # hashlib releases the GIL on big buffers, and the page cache does the rest
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    return hashlib.sha1(mapped).hexdigest()
+            return hashlib.sha1(f.read()).hexdigest()
+    except OSError:
+        return None
+
+
+def _hash_batch(paths):
+    # Runs in a worker process
+    return [(path, hash_file(path)) for path in paths]
+
+
+def _pool_context():
+    # Not fork: the launcher has worker, timer and supervisor threads going, and
+    # a forked child could inherit one of their locks mid-use. The fork server
+    # only preloads this module, so every worker starts out with just what it
+    # needs for hashing
+    context = multiprocessing.get_context("forkserver")
+    context.set_forkserver_preload([__name__])
+    return context
+
+
+@contextlib.contextmanager
+def _workers_without_main():
+    # A new worker re-runs the parent's __main__ before it does anything else -
+    # in the GUI that's launcher.py with all of GTK. While the workers start,
+    # this module stands in for __main__, so they re-run it instead
+    main = sys.modules["__main__"]
+    sys.modules["__main__"] = sys.modules[__name__]
+    try:
+        yield
+    finally:
+        sys.modules["__main__"] = main
+
+
+class Verifier:
+    # Checks every file a version needs against its SHA1 using a process pool,
+    # and only re-downloads the ones that are broken. Progress is checkpointed to
+    # data_dir/cache/verify/<version>.json so an interrupted run picks up where
+    # it stopped instead of rehashing gigabytes again.
+    def __init__(self, minecraft_dir, data_dir=None, workers=None, task=None, downloader=None):
+        self.minecraft_dir = minecraft_dir
+        self.data_dir = data_dir or minecraft_dir
+        self.workers = workers or os.cpu_count() or 1
+        self.task = task
+        self.downloader = downloader or Downloader(minecraft_dir, task=task)
+        self.checkpoint_dir = os.path.join(self.data_dir, "cache", "verify")
+
+    def _report(self, status=None, current=None, total=None):
+        if self.task:
+            self.task.report(status, current, total)
+
+    def _checkpoint_path(self, version_id):
+        return os.path.join(self.checkpoint_dir, f"{version_id}.json")
+
+    def _load_checkpoint(self, version_id, fingerprint):
+        try:
+            with open(self._checkpoint_path(version_id), "r") as f:
+                checkpoint = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return {}
+        if checkpoint.get("fingerprint") != fingerprint:
+            return {}
+        return checkpoint.get("verified", {})
+
+    def _save_checkpoint(self, version_id, fingerprint, verified):
+        os.makedirs(self.checkpoint_dir, exist_ok=True)
+        temp_path = self._checkpoint_path(version_id) + ".tmp"
+        with open(temp_path, "w") as f:
+            json.dump({"fingerprint": fingerprint, "verified": verified}, f)
+        os.replace(temp_path, self._checkpoint_path(version_id))
+
+    def _clear_checkpoint(self, version_id):
+        try:
+            os.remove(self._checkpoint_path(version_id))
+        except FileNotFoundError:
+            pass
+
+    def verify(self, version_id, repair=True):
+        start = time.monotonic()
+        self._report(f"Verifying {version_id}")
+        all_items = self.downloader.expected_items(version_id)
+        by_path = {item.path: item for item in all_items if item.sha1}
+        fingerprint = version_fingerprint(version_id, self.minecraft_dir)
+
+        # Anything the checkpoint already vouched for (with the same size and
+        # mtime) doesn't need hashing again
+        verified = self._load_checkpoint(version_id, fingerprint)
+        todo = []
+        for path, item in by_path.items():
+            rel = os.path.relpath(path, self.minecraft_dir)
+            try:
+                st = os.stat(path)
+            except OSError:
+                todo.append(path)
+                continue
+            if verified.get(rel) == [st.st_size, st.st_mtime_ns]:
+                continue
+            verified.pop(rel, None)
+            todo.append(path)
+
+        resumed = len(by_path) - len(todo)
+        if resumed:
+            logging.info(f"Resuming verification of {version_id}, {resumed} file(s) already checked.")
+
+        bad = []
+        done = resumed
+        total = len(by_path)
+        last_checkpoint = time.monotonic()
+        batches = [todo[i:i + BATCH_SIZE] for i in range(0, len(todo), BATCH_SIZE)]
+        executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=_pool_context())
+        try:
+            # Workers start as the work is submitted
+            with _workers_without_main():
+                futures = [executor.submit(_hash_batch, batch) for batch in batches]
+            for future in as_completed(futures):
+                for path, sha1 in future.result():
+                    if sha1 == by_path[path].sha1:
+                        st = os.stat(path)
+                        verified[os.path.relpath(path, self.minecraft_dir)] = [st.st_size, st.st_mtime_ns]
+                    else:
+                        bad.append(by_path[path])
+                done += len(future.result())
+                self._report(f"Verifying {version_id}", done, total)
+                if time.monotonic() - last_checkpoint > CHECKPOINT_INTERVAL:
+                    self._save_checkpoint(version_id, fingerprint, verified)
+                    last_checkpoint = time.monotonic()
+        except BaseException:
+            executor.shutdown(wait=False, cancel_futures=True)
+            self._save_checkpoint(version_id, fingerprint, verified)
+            raise
+        executor.shutdown(wait=True)
+
+        logging.info(f"Verified {total} file(s) of {version_id} in {time.monotonic() - start:.2f}s "
+                     f"with {self.workers} processes, {len(bad)} bad.")
+
+        if bad and repair:
+            self.repair(bad)
+        if not bad or repair:
+            self._clear_checkpoint(version_id)
+            # Fresh, fully hashed index - the next launch can trust it
+            InstallIndex(self.data_dir, self.minecraft_dir).save(
+                version_id, [(item.path, item.sha1) for item in self.downloader.installed_items + all_items])
+        else:
+            self._save_checkpoint(version_id, fingerprint, verified)
+        return bad
+
+    def repair(self, items):
+        logging.warning(f"Repairing {len(items)} file(s).")
+        store = self.downloader.store
+        for item in items:
+            # If the broken file is a hardlink into the shared store, the stored
+            # copy is broken too - drop it so it can't be handed out again
+            if store and store.is_shared(item.path, item.sha1):
+                store.discard(item.sha1)
+            if os.path.exists(item.path):
+                os.remove(item.path)
+        self.downloader.download_all(items, "Repairing files")
+
+
+def main(argv=None):
+    import pipeline
+    from config_store import setup_logging
+
+    parser = argparse.ArgumentParser(description="Verify (and repair) an installed Minecraft version.")
+    parser.add_argument("version", help="Version id, e.g. 1.20.4")
+    parser.add_argument("--workers", type=int, default=None, help="Hashing processes (default: CPU count)")
+    parser.add_argument("--no-repair", action="store_true", help="Only report broken files")
+    args = parser.parse_args(argv)
+
+    data_dir = pipeline.default_data_dir()
+    setup_logging(data_dir)
+    bad = pipeline.verify_version(args.version, data_dir, data_dir=data_dir,
+                                  config=pipeline.read_config(data_dir), workers=args.workers,
+                                  repair=not args.no_repair)
+    for item in bad:
+        print(os.path.relpath(item.path, data_dir))
+    return 1 if bad and args.no_repair else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
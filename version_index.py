@@ -0,0 +1,49 @@
+class VersionIndex:
+    # All known versions, newest first, indexed every way the UI needs to look
+    # them up: by id, by position and by type ("release", "snapshot", "old_beta",
+    # ...). Built once per manifest refresh so the UI never has to scan for a
+    # selection or a type filter.
+    def __init__(self, versions=()):
+        self.order = []
+        self.entries = {}
+        self.position = {}
+        self.buckets = {}
+        for entry in versions:
+            version_id = entry["id"]
+            if version_id in self.entries:
+                continue
+            self.position[version_id] = len(self.order)
+            self.order.append(version_id)
+            self.entries[version_id] = entry
+            self.buckets.setdefault(entry.get("type") or "custom", []).append(version_id)
+
+    def __len__(self):
+        return len(self.order)
+
+    def __contains__(self, version_id):
+        return version_id in self.entries
+
+    def __iter__(self):
+        return iter(self.order)
+
+    def get(self, version_id, default=None):
+        return self.entries.get(version_id, default)
+
+    def type_of(self, version_id):
+        entry = self.entries.get(version_id)
+        return (entry.get("type") or "custom") if entry else None
+
+    def types(self):
+        return list(self.buckets)
+
+    def ids(self, version_type=None):
+        if version_type is None:
+            return self.order
+        return self.buckets.get(version_type, [])
+
+    def search(self, text="", version_type=None):
+        ids = self.ids(version_type)
+        text = text.strip().lower()
+        if not text:
+            return ids
+        return [version_id for version_id in ids if text in version_id.lower()]